@@ -0,0 +1,87 @@
+import os
+from datetime import timedelta
+from flask import jsonify
+from flask_jwt_extended import JWTManager
+from flasgger import Swagger
+from config import app, password_pool, request_metrics
+from routes.auth_routes import auth_bp
+from routes.bulk_routes import bulk_bp
+from routes.metrics_routes import metrics_bp
+from routes.profiling_routes import profiling_bp
+from routes.sensor_routes import sensor_bp
+from routes.stream_routes import stream_bp
+from utils.ingest import ingest_queue
+from utils.user_cache import user_cache
+
+jwt = JWTManager()
+
+SWAGGER_CONFIG = {
+    'title': 'Sensor API',
+    'version': 3,
+    "specs_route": "/api/docs/",
+    "securityDefinitions": {
+        "Bearer": {
+            "type": "apiKey",
+            "name": "Authorization",
+            "in": "header",
+            "description": "JWT Authorization header using the Bearer scheme. Example: \"Authorization: Bearer {token}\""
+        }
+    },
+    "security": [
+        {
+            "Bearer": []
+        }
+    ]
+}
+
+
+@jwt.user_lookup_loader
+def load_current_user(_jwt_header, jwt_data):
+    # Backs flask_jwt_extended.current_user on every protected route
+    return user_cache.get(jwt_data["sub"])
+
+
+@jwt.user_lookup_error_loader
+def current_user_not_found(_jwt_header, _jwt_data):
+    return jsonify({"message": "User not found"}), 401
+
+
+def _queue_metrics():
+    ingest = ingest_queue.stats()
+    passwords = password_pool.stats()
+    return [
+        ("ingest_queue_depth", "gauge", "Readings waiting in the async ingest queue.", [({}, ingest["queueDepth"])]),
+        ("ingest_readings_total", "counter", "Readings handled by the async ingest queue, by outcome.",
+         [({"outcome": outcome}, ingest[outcome]) for outcome in ("enqueued", "rejected", "committed", "failed")]),
+        ("password_jobs_total", "counter", "Password hashing jobs, by outcome.",
+         [({"outcome": outcome}, passwords[outcome]) for outcome in ("completed", "rejected", "timedOut", "rehashed")]),
+    ]
+
+
+def create_app():
+    """
+    Returns the application with JWT, Swagger and every blueprint registered.
+    The Flask app and its extensions are module-level singletons (see config.py),
+    so this finishes configuring that instance and is safe to call more than once.
+    It does not touch the database: creating the schema, migrating and seeding
+    are separate steps (python -m utils.migrations, python -m utils.db_setup).
+    """
+    if "auth_bp" in app.blueprints:
+        return app
+
+    app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "default-super-secret-key-for-dev")
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=15)
+    app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=30)
+    jwt.init_app(app)
+
+    app.config['SWAGGER'] = SWAGGER_CONFIG
+    Swagger(app)
+
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(sensor_bp)
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(bulk_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiling_bp)
+    request_metrics.add_collector(_queue_metrics)
+    return app
@@ -0,0 +1,130 @@
+"""
+Measures the effect of the (sensor_id, timestamp, id) index on the sensor_data
+time-series queries at different table sizes.
+
+For each row count the script builds a fresh SQLite database from the model DDL,
+times the queries without the index, creates the index and times them again.
+Query plans and median latencies are printed as one JSON object per row count.
+
+    python -m benchmarks.bench_sensor_data_index --rows 1000000 10000000 50000000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+from models import SensorData
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+QUERIES = {
+    "full_history": (
+        "SELECT id, temperature, humidity, pressure, light_level, timestamp, sensor_id FROM sensor_data "
+        "WHERE sensor_id = :sensor_id ORDER BY timestamp, id"
+    ),
+    "one_day_window": (
+        "SELECT id, temperature, humidity, pressure, light_level, timestamp, sensor_id FROM sensor_data "
+        "WHERE sensor_id = :sensor_id AND timestamp >= :start AND timestamp < :end ORDER BY timestamp, id"
+    ),
+    "keyset_page": (
+        "SELECT id, temperature, humidity, pressure, light_level, timestamp, sensor_id FROM sensor_data "
+        "WHERE sensor_id = :sensor_id AND (timestamp > :start OR (timestamp = :start AND id > 0)) "
+        "ORDER BY timestamp, id LIMIT 1000"
+    ),
+}
+
+
+def _generate_rows(row_count, sensors, start):
+    """
+    Readings arrive interleaved across sensors, one per sensor per minute, like a live fleet.
+    """
+    rng = random.Random(42)
+    for i in range(row_count):
+        timestamp = start + timedelta(minutes=i // sensors)
+        yield (
+            round(rng.uniform(15.0, 30.0), 2),
+            round(rng.uniform(30.0, 60.0), 2),
+            round(rng.uniform(980.0, 1050.0), 2),
+            round(rng.uniform(100, 1000), 2),
+            timestamp.strftime(TIMESTAMP_FORMAT),
+            i % sensors + 1,
+        )
+
+
+def _build_database(path, row_count, sensors, start):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    ddl = CreateTable(SensorData.__table__).compile(dialect=sqlite.dialect())
+    connection.execute(str(ddl))
+    connection.executemany(
+        "INSERT INTO sensor_data (temperature, humidity, pressure, light_level, timestamp, sensor_id) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        _generate_rows(row_count, sensors, start),
+    )
+    connection.commit()
+    return connection
+
+
+def _measure(connection, params, repeat):
+    results = {}
+    for name, sql in QUERIES.items():
+        plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = connection.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            "plan": plan,
+            "rows": len(rows),
+            "median_ms": round(statistics.median(timings), 3),
+        }
+    return results
+
+
+def run(row_count, sensors, repeat, directory):
+    start = datetime(2024, 1, 1)
+    path = os.path.join(directory, f"sensor_data_{row_count}.db")
+    if os.path.exists(path):
+        os.remove(path)
+
+    started = time.perf_counter()
+    connection = _build_database(path, row_count, sensors, start)
+    load_seconds = time.perf_counter() - started
+
+    middle = start + timedelta(minutes=row_count // sensors // 2)
+    params = {
+        "sensor_id": sensors // 2 + 1,
+        "start": middle.strftime(TIMESTAMP_FORMAT),
+        "end": (middle + timedelta(days=1)).strftime(TIMESTAMP_FORMAT),
+    }
+    result = {"rows": row_count, "sensors": sensors, "load_seconds": round(load_seconds, 1)}
+    result["without_index"] = _measure(connection, params, repeat)
+
+    started = time.perf_counter()
+    for index in SensorData.__table__.indexes:
+        connection.execute(str(CreateIndex(index).compile(dialect=sqlite.dialect())))
+    connection.execute("ANALYZE")
+    result["index_build_seconds"] = round(time.perf_counter() - started, 1)
+    result["with_index"] = _measure(connection, params, repeat)
+
+    connection.close()
+    os.remove(path)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sensor_data queries with and without the time-series index.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument("--sensors", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dir", default=tempfile.gettempdir(), help="Where to build the temporary databases.")
+    args = parser.parse_args()
+    for row_count in args.rows:
+        print(json.dumps(run(row_count, args.sensors, args.repeat, args.dir)), flush=True)
@@ -0,0 +1,62 @@
+"""
+Compares two benchmarks.run_api reports, e.g. from before and after a change.
+
+Prints the relative change of every latency percentile and throughput per
+endpoint and exits with status 1 when any of them regressed by more than
+--threshold percent, so it can gate a CI job.
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# Metric name and whether a higher value is better
+METRICS = (("p50Ms", False), ("p95Ms", False), ("p99Ms", False), ("throughputRps", True))
+
+
+def compare_reports(baseline, candidate, threshold):
+    """
+    Returns (rows, regressions) where rows are (endpoint, metric, old, new, change %)
+    and regressions the subset worse than threshold percent.
+    """
+    rows, regressions = [], []
+    for endpoint, old in baseline["endpoints"].items():
+        new = candidate["endpoints"].get(endpoint)
+        if new is None:
+            continue
+        for metric, higher_is_better in METRICS:
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            row = (endpoint, metric, before, after, change)
+            rows.append(row)
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two API benchmark reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent.")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+    for key in ("target", "concurrency", "readings"):
+        if baseline["meta"].get(key) != candidate["meta"].get(key):
+            print(f"Warning: the reports differ in {key}, results are not directly comparable.", file=sys.stderr)
+
+    rows, regressions = compare_reports(baseline, candidate, args.threshold)
+    print(f"{'endpoint':<28} {'metric':<14} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for endpoint, metric, before, after, change in rows:
+        print(f"{endpoint:<28} {metric:<14} {before:>10} {after:>10} {change:>+7.1f}%")
+    print(f"Peak RSS: {baseline['peakRssMb']} MB -> {candidate['peakRssMb']} MB")
+
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold}%.", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,135 @@
+"""
+Password hashing throughput, to pick PASSWORD_HASH_METHOD and size PASSWORD_WORKERS.
+
+For every method it reports how long one hash takes, how many logins (password
+verifications) one core sustains per second, and what the PasswordPool delivers
+when `--concurrency` clients log in at once: completed and rejected (503)
+verifications per second and the latency clients see.
+
+    python -m benchmarks.passwords --seconds 5 --concurrency 32 --output passwords.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+from benchmarks.run_api import _git_commit, _percentile
+from utils.passwords import PasswordHasher, PasswordPool, PasswordPoolBusy
+
+DEFAULT_METHODS = (
+    "pbkdf2:sha256:600000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+    "argon2:3:65536:4",
+)
+PASSWORD = "correct horse battery staple"
+
+
+def _single_core(hasher, password_hash, seconds):
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        hasher.verify(password_hash, PASSWORD)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def _pooled(method, password_hash, seconds, concurrency, workers, queue_size):
+    """
+    `concurrency` threads verify through a PasswordPool for `seconds`. Rejected
+    clients back off briefly, as a client honouring Retry-After would.
+    """
+    pool = PasswordPool()
+    pool.configure(method, workers, queue_size)
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        nonlocal rejected
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                pool.verify(password_hash, PASSWORD)
+            except PasswordPoolBusy:
+                with lock:
+                    rejected += 1
+                time.sleep(0.01)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "loginsPerSecond": round(len(latencies) / wall, 1),
+        "rejectedPerSecond": round(rejected / wall, 1),
+        "p50Ms": to_ms(_percentile(latencies, 0.50)),
+        "p95Ms": to_ms(_percentile(latencies, 0.95)),
+        "maxMs": to_ms(latencies[-1] if latencies else None),
+    }
+
+
+def run_benchmark(methods, seconds, concurrency, workers, queue_size):
+    results = {}
+    for method in methods:
+        try:
+            hasher = PasswordHasher(method)
+        except RuntimeError as e:
+            print(f"Skipping {method}: {e}", file=sys.stderr)
+            continue
+        print(f"Running {method}...", file=sys.stderr)
+        started = time.perf_counter()
+        password_hash = hasher.hash(PASSWORD)
+        hash_ms = (time.perf_counter() - started) * 1000
+        results[method] = {
+            "hashMs": round(hash_ms, 2),
+            "loginsPerSecondPerCore": round(_single_core(hasher, password_hash, seconds), 1),
+            "pool": _pooled(method, password_hash, seconds, concurrency, workers, queue_size),
+        }
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "startedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "workers": workers,
+            "queueSize": queue_size,
+            "concurrency": concurrency,
+            "secondsPerMeasurement": seconds,
+        },
+        "methods": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark password hashing methods and the verification pool.")
+    parser.add_argument("--method", action="append", dest="methods",
+                        help="Hash method to measure (repeatable). Defaults to a set of scrypt, pbkdf2 and argon2 costs.")
+    parser.add_argument("--seconds", type=float, default=3, help="Duration of each measurement.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Simultaneous logins against the pool.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Pool worker threads.")
+    parser.add_argument("--queue-size", type=int, default=16, help="Pool queue limit.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of standard output.")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.methods or DEFAULT_METHODS, args.seconds, args.concurrency, args.workers, args.queue_size)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
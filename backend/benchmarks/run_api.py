@@ -0,0 +1,289 @@
+"""
+Load test of the HTTP API against a seeded benchmark database.
+
+Drives the real endpoints (login, /sensors, /details_sensor, POST /sensor_data)
+either in-process through the Flask test client, which isolates application and
+database cost, over HTTP through a local threaded WSGI server, which adds
+request parsing and socket overhead, or against a server started separately
+(--target url), e.g. to compare the dev server with gunicorn. Results are
+printed (or written with --output) as JSON with p50/p95/p99 latencies,
+throughput and peak RSS per endpoint, and can be diffed between commits with
+benchmarks.compare. With --target url the RSS is the load generator's own.
+
+    python -m benchmarks.seed --database benchmark.db --sensors 100 --readings-per-sensor 100000
+    python -m benchmarks.run_api --database benchmark.db --target wsgi --concurrency 8 --output before.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+TARGETS = ("client", "wsgi", "url")
+LOGIN = {"username": "admin1", "password": "password"}
+
+
+def _scenarios(sensor_ids, rng):
+    """
+    (name, method, path factory, body factory, needs token) for every benchmarked endpoint.
+    """
+    def reading():
+        return {
+            "sensorId": rng.choice(sensor_ids),
+            "temperature": round(rng.uniform(15.0, 30.0), 2),
+            "humidity": round(rng.uniform(30.0, 60.0), 2),
+            "pressure": round(rng.uniform(980.0, 1050.0), 2),
+            "lightLevel": round(rng.uniform(100, 1000), 2),
+        }
+
+    sensor_path = lambda query: lambda: f"/details_sensor/{rng.choice(sensor_ids)}?{query}"
+    return [
+        ("login", "POST", lambda: "/login", lambda: LOGIN, False),
+        ("sensors", "GET", lambda: "/sensors", None, False),
+        ("details_sensor_page", "GET", sensor_path("limit=1000"), None, False),
+        ("details_sensor_downsampled", "GET", sensor_path("downsample=1000"), None, False),
+        ("create_sensor_data", "POST", lambda: "/sensor_data", reading, True),
+    ]
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    """
+    Sends requests to an already running server over HTTP/1.1 keep-alive
+    connections, one per client thread.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port)
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self.local.connection = None
+            raise
+
+    def close(self):
+        pass
+
+
+class WSGITransport(HTTPTransport):
+    """
+    Serves the app from a threaded werkzeug server on a free local port and sends
+    requests to it over HTTP.
+    """
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class KeepAliveHandler(WSGIRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveHandler)
+        super().__init__("127.0.0.1", self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(transport, scenario, token, requests_count, concurrency, warmup):
+    """
+    Sends requests_count requests of one scenario from `concurrency` threads and
+    returns its latency percentiles (milliseconds), throughput and error count.
+    """
+    name, method, path, body, needs_token = scenario
+    headers = {"Authorization": f"Bearer {token}"} if needs_token else {}
+    lock = threading.Lock()
+
+    def send():
+        payload = body() if body else None
+        started = time.perf_counter()
+        try:
+            status, _ = transport.request(method, path(), payload, headers)
+        except (http.client.HTTPException, OSError):
+            status = None
+        elapsed = time.perf_counter() - started
+        return elapsed, status is not None and status < 400
+
+    for _ in range(warmup):
+        send()
+
+    latencies = []
+    errors = 0
+
+    def worker(count):
+        nonlocal errors
+        for _ in range(count):
+            elapsed, ok = send()
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors += 1
+
+    shares = [requests_count // concurrency + (1 if i < requests_count % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, shares))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50Ms": to_ms(_percentile(latencies, 0.50)),
+        "p95Ms": to_ms(_percentile(latencies, 0.95)),
+        "p99Ms": to_ms(_percentile(latencies, 0.99)),
+        "maxMs": to_ms(latencies[-1] if latencies else None),
+        "throughputRps": round(len(latencies) / wall, 1) if wall else None,
+        "peakRssMb": _peak_rss_mb(),
+    }
+
+
+def run_benchmark(target, requests_count, concurrency, warmup, only=None, seed=42, url=None):
+    from app_factory import create_app
+    from config import db
+    from models import Sensor, SensorData
+
+    app = create_app()
+
+    with app.app_context():
+        sensor_ids = list(db.session.scalars(db.select(Sensor.id)))
+        readings = db.session.scalar(db.select(db.func.count()).select_from(SensorData))
+    if not sensor_ids:
+        raise SystemExit("The benchmark database has no sensors, run benchmarks.seed first.")
+
+    rng = random.Random(seed)
+    if target == "client":
+        transport = TestClientTransport(app)
+    elif target == "wsgi":
+        transport = WSGITransport(app)
+    else:
+        # A server started separately (dev server, gunicorn) on the same database
+        parsed = urlsplit(url)
+        transport = HTTPTransport(parsed.hostname, parsed.port or 80)
+    try:
+        status, body = transport.request("POST", "/login", LOGIN)
+        if status != 200:
+            raise SystemExit(f"Login failed with status {status}: {body[:200]!r}")
+        token = json.loads(body)["accessToken"]
+
+        endpoints = {}
+        for scenario in _scenarios(sensor_ids, rng):
+            if only and scenario[0] not in only:
+                continue
+            print(f"Running {scenario[0]}...", file=sys.stderr)
+            endpoints[scenario[0]] = run_scenario(transport, scenario, token, requests_count, concurrency, warmup)
+    finally:
+        transport.close()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "startedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": target,
+            "url": url,
+            "concurrency": concurrency,
+            "requestsPerEndpoint": requests_count,
+            "database": app.config["SQLALCHEMY_DATABASE_URI"],
+            "cacheBackend": app.config["CACHE_BACKEND"],
+            "sensors": len(sensor_ids),
+            "readings": readings,
+        },
+        "endpoints": endpoints,
+        "peakRssMb": _peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the sensor API and report latency percentiles as JSON.")
+    parser.add_argument("--target", choices=TARGETS, default="client",
+                        help="client: Flask test client, wsgi: in-process werkzeug server, url: a running server (--url).")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL for --target url.")
+    parser.add_argument("--database", default="benchmark.db",
+                        help="SQLite file seeded by benchmarks.seed, relative to the instance folder. "
+                             "POST /sensor_data writes to it; DATABASE_URL is ignored.")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per endpoint.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Client threads.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per endpoint.")
+    parser.add_argument("--endpoint", action="append", dest="only", help="Only run this scenario (repeatable).")
+    parser.add_argument("--cache", choices=("memory", "none"), default="none",
+                        help="Response cache backend. Disabled by default so handler cost is measured.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of standard output.")
+    args = parser.parse_args()
+
+    # Must be set before config is imported
+    os.environ["CACHE_BACKEND"] = args.cache
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.database}"
+    report = run_benchmark(args.target, args.requests, args.concurrency, args.warmup, args.only, url=args.url)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,57 @@
+"""
+Seeds a benchmark database with synthetic sensors and readings.
+
+Starts from the regular seed_database() fixtures (users, sensors, a few readings)
+and adds sensors and NumPy-generated history on top through the bulk insert
+path, so datasets of millions of rows can be built in minutes. The database is
+wiped first, so the target SQLite file must be named with --database; DATABASE_URL
+is ignored, so an exported production setting cannot be wiped by accident.
+
+    python -m benchmarks.seed --database benchmark.db --sensors 100 --readings-per-sensor 100000
+"""
+import argparse
+import os
+from datetime import timedelta
+
+
+def seed_benchmark_data(sensors, readings_per_sensor, interval_seconds=60, seed=42):
+    """
+    Rebuilds the database with `sensors` sensors holding about `readings_per_sensor`
+    readings each (less the simulated gaps), spaced interval_seconds apart and
+    ending now. Returns the number of readings inserted.
+    """
+    from config import db
+    from utils.db_setup import seed_database
+    from utils.migrations import run_migrations
+    from utils.partitions import drop_storage_layout
+    from utils.synthetic_data import ensure_sensors, generate_history
+    from utils.timeseries import utc_now
+
+    drop_storage_layout()
+    db.drop_all()
+    db.create_all()
+    run_migrations()
+    seed_database()
+
+    sensor_ids = ensure_sensors(sensors, seed)
+    end = utc_now()
+    start = end - timedelta(seconds=interval_seconds * readings_per_sensor)
+    return generate_history(sensor_ids, start, end, interval_seconds, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a benchmark database with synthetic sensor data.")
+    parser.add_argument("--database", required=True,
+                        help="SQLite file to wipe and fill, relative to the instance folder (e.g. benchmark.db).")
+    parser.add_argument("--sensors", type=int, default=100)
+    parser.add_argument("--readings-per-sensor", type=int, default=10000)
+    parser.add_argument("--interval", type=int, default=60, help="Seconds between readings of one sensor.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Must be set before config is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.database}"
+    from config import app
+
+    with app.app_context():
+        seed_benchmark_data(args.sensors, args.readings_per_sensor, args.interval, args.seed)
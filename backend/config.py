@@ -1,8 +1,22 @@
+import os
+import sqlite3
+from dotenv import load_dotenv
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from utils.broadcaster import Broadcaster
+from utils.cache import ResponseCache
+from utils.json_provider import FastJSONProvider
+from utils.metrics import RequestMetrics, RowCountingConnection
+from utils.passwords import PasswordPool
+from utils.profiling import RequestProfiler
+
+load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app, resources={
      r"/*": {
          "origins": ["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost:5173"],
@@ -11,7 +25,111 @@ CORS(app, resources={
      }
  })
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///mydatabase.db"
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+def engine_options(database_uri):
+    """
+    Builds SQLALCHEMY_ENGINE_OPTIONS from the environment.
+    Pool sizing does not apply to in-memory SQLite, which uses a single shared connection.
+    """
+    options = {
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    }
+    if database_uri.startswith("sqlite") and _env_bool("METRICS_ENABLED", True):
+        # Counts rows returned per request for the metrics; sqlite3 itself does not report them
+        options["connect_args"] = {"factory": RowCountingConnection}
+    if database_uri.startswith("sqlite") and (":memory:" in database_uri or database_uri.rstrip("/") == "sqlite:"):
+        return options
+    options["pool_size"] = int(os.environ.get("DB_POOL_SIZE", 10))
+    options["max_overflow"] = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    options["pool_timeout"] = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    return options
+
+
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///mydatabase.db")
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+app.config["SQLITE_CACHE_SIZE_KB"] = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 65536))
+app.config["SQLITE_AUTO_VACUUM"] = os.environ.get("SQLITE_AUTO_VACUUM", "INCREMENTAL")
+app.config["SENSOR_DATA_PARTITIONING"] = os.environ.get("SENSOR_DATA_PARTITIONING", "none")
+app.config["SENSOR_DATA_MAX_BATCH"] = int(os.environ.get("SENSOR_DATA_MAX_BATCH", 10000))
+app.config["ANALYTICS_MAX_POINTS"] = int(os.environ.get("ANALYTICS_MAX_POINTS", 1000000))
+app.config["IMPORT_CHUNK_SIZE"] = int(os.environ.get("IMPORT_CHUNK_SIZE", 20000))
+app.config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "memory")
+app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 300))
+app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+app.config["PASSWORD_WORKERS"] = int(os.environ.get("PASSWORD_WORKERS", 0)) or None
+app.config["PASSWORD_QUEUE_SIZE"] = int(os.environ.get("PASSWORD_QUEUE_SIZE", 16))
+app.config["PASSWORD_TIMEOUT_SECONDS"] = float(os.environ.get("PASSWORD_TIMEOUT_SECONDS", 10))
+app.config["METRICS_ENABLED"] = _env_bool("METRICS_ENABLED", True)
+app.config["SLOW_REQUEST_MS"] = int(os.environ.get("SLOW_REQUEST_MS", 0))
+app.config["PROFILING_ENABLED"] = _env_bool("PROFILING_ENABLED", False)
+app.config["PROFILING_DIR"] = os.environ.get("PROFILING_DIR") or None
+app.config["PROFILING_KEEP"] = int(os.environ.get("PROFILING_KEEP", 100))
+app.config["PROFILING_SAMPLE_MS"] = float(os.environ.get("PROFILING_SAMPLE_MS", 1))
+app.config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", 60))
+app.config["USER_CACHE_MAX_ENTRIES"] = int(os.environ.get("USER_CACHE_MAX_ENTRIES", 1024))
+app.config["STREAM_QUEUE_SIZE"] = int(os.environ.get("STREAM_QUEUE_SIZE", 1000))
+app.config["STREAM_HEARTBEAT_SECONDS"] = int(os.environ.get("STREAM_HEARTBEAT_SECONDS", 15))
+app.config["STREAM_POLL_MS"] = int(os.environ.get("STREAM_POLL_MS", 1000))
+app.config["INGEST_MODE"] = os.environ.get("INGEST_MODE", "sync")
+app.config["INGEST_QUEUE_SIZE"] = int(os.environ.get("INGEST_QUEUE_SIZE", 10000))
+app.config["INGEST_BATCH_SIZE"] = int(os.environ.get("INGEST_BATCH_SIZE", 500))
+app.config["INGEST_FLUSH_MS"] = int(os.environ.get("INGEST_FLUSH_MS", 50))
+app.config["CACHE_REDIS_URL"] = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+app.config["RETENTION_RAW_DAYS"] = int(os.environ.get("RETENTION_RAW_DAYS", 0))
+app.config["RETENTION_1M_ROLLUP_DAYS"] = int(os.environ.get("RETENTION_1M_ROLLUP_DAYS", 0))
+app.config["RETENTION_BATCH_SIZE"] = int(os.environ.get("RETENTION_BATCH_SIZE", 5000))
+app.config["RETENTION_BATCH_PAUSE_MS"] = int(os.environ.get("RETENTION_BATCH_PAUSE_MS", 50))
+app.config["RETENTION_INTERVAL_MINUTES"] = int(os.environ.get("RETENTION_INTERVAL_MINUTES", 0))
+app.config["GENERATE_DATA_INTERVAL_SECONDS"] = float(os.environ.get("GENERATE_DATA_INTERVAL_SECONDS", 0))
+app.config["ROLLUP_RECONCILE_INTERVAL_MINUTES"] = int(os.environ.get("ROLLUP_RECONCILE_INTERVAL_MINUTES", 0))
+app.config["SCHEDULER_JITTER"] = float(os.environ.get("SCHEDULER_JITTER", 0.1))
+app.config["SCHEDULER_LOCK_DIR"] = os.environ.get("SCHEDULER_LOCK_DIR") or None
+
+# Upserts and time bucketing are written for these two; fail here rather than on the first write
+SUPPORTED_DATABASES = ("sqlite", "postgresql")
+_database = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+if _database not in SUPPORTED_DATABASES:
+    raise ValueError(f"Unsupported database in DATABASE_URL: {_database} (use {' or '.join(SUPPORTED_DATABASES)})")
+if app.config["SENSOR_DATA_PARTITIONING"] not in ("none", "monthly"):
+    raise ValueError(f"Unknown SENSOR_DATA_PARTITIONING: {app.config['SENSOR_DATA_PARTITIONING']}")
+if app.config["SENSOR_DATA_PARTITIONING"] == "monthly" and _database != "sqlite":
+    raise ValueError("SENSOR_DATA_PARTITIONING=monthly is only supported on SQLite")
+
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers proceed while one connection writes; busy_timeout makes writers
+    wait for the lock instead of failing with "database is locked".
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # Only takes effect on a new, empty database; existing files keep their mode
+    # until utils.retention --enable-incremental-vacuum rewrites them
+    cursor.execute(f"PRAGMA auto_vacuum = {app.config['SQLITE_AUTO_VACUUM']}")
+    cursor.execute(f"PRAGMA journal_mode = {app.config['SQLITE_JOURNAL_MODE']}")
+    cursor.execute(f"PRAGMA synchronous = {app.config['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA busy_timeout = {int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    # A negative cache_size is interpreted by SQLite as KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size = -{int(app.config['SQLITE_CACHE_SIZE_KB'])}")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    cursor.close()
+
 
-db = SQLAlchemy(app)
\ No newline at end of file
+db = SQLAlchemy(app)
+response_cache = ResponseCache(app)
+broadcaster = Broadcaster(app.config["STREAM_QUEUE_SIZE"])
+password_pool = PasswordPool(app)
+request_metrics = RequestMetrics(app)
+request_profiler = RequestProfiler(app)
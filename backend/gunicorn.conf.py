@@ -0,0 +1,73 @@
+"""
+Production server settings: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment (GUNICORN_*) or the command line.
+
+- gthread workers: each worker process serves `threads` requests at once. Request
+  handlers mostly wait on SQLite, JSON encoding and password hashing, which
+  release the GIL, and SSE streams (/stream) hold a thread for as long as they stay open.
+- SQLite allows one writer at a time, so adding processes beyond the number of
+  cores mainly adds lock waits. With CACHE_BACKEND=redis or none start at one
+  worker per core. The memory cache is per process and a write only invalidates
+  the copy of the worker that served it, so with it the default is one worker
+  and more are refused.
+- Graceful reload: `kill -HUP <master>` starts new workers and lets the old ones
+  finish in-flight requests within graceful_timeout. With preload_app the code is
+  loaded once in the master, which shares memory between workers and fails fast on
+  import errors, but HUP then only reloads configuration. To deploy new code send
+  USR2, then WINCH and QUIT to the old master, or run with GUNICORN_PRELOAD=0.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+worker_class = "gthread"
+_shared_cache = os.environ.get("CACHE_BACKEND", "memory") != "memory"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() if _shared_cache else 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Idle keep-alive connections hold a thread in gthread workers, keep this short
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# Recycle workers now and then so slow leaks cannot accumulate; jitter avoids restarting all at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+
+def on_starting(server):
+    """
+    Creates and migrates the schema once, in the master, before any worker starts.
+    Seeding demo data is left to `python -m utils.db_setup`.
+    """
+    from config import app, db
+    from utils.migrations import run_migrations
+
+    if server.cfg.workers > 1 and app.config["CACHE_BACKEND"] == "memory":
+        raise RuntimeError(
+            f"{server.cfg.workers} workers with CACHE_BACKEND=memory would serve stale responses, "
+            "since each worker caches separately. Use CACHE_BACKEND=redis (or none), or one worker."
+        )
+
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        # Connections must not be inherited by forked workers
+        db.engine.dispose()
+
+
+def post_fork(server, worker):
+    from config import app, db
+
+    # With preload_app the master may have opened connections; the child drops its copies
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    from utils.ingest import ingest_queue
+
+    # Write readings still queued by INGEST_MODE=async before the worker goes away
+    ingest_queue.shutdown()
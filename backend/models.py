@@ -1,6 +1,4 @@
-from config import db
-from werkzeug.security import generate_password_hash
-from werkzeug.security import check_password_hash
+from config import db, password_pool
 from datetime import datetime
 from datetime import timezone
 
@@ -21,10 +19,11 @@ class CredentialsHashModel(db.Model):
 
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_pool.hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Runs in the calling thread; request handlers go through password_pool instead
+        return password_pool.hasher.verify(self.password_hash, password)
 
 
 class User(CredentialsHashModel):
@@ -51,24 +50,33 @@ class Sensor(db.Model):
     name = db.Column(db.String(100), nullable=False)
     ip_address = db.Column(db.String(45), nullable=False, unique=True)
     data_points = db.relationship('SensorData', backref='sensor', lazy=True, cascade="all, delete-orphan")
+    rollups = db.relationship('SensorRollup', lazy=True, cascade="all, delete-orphan")
+    latest = db.relationship('SensorLatest', uselist=False, lazy=True, cascade="all, delete-orphan")
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Days of raw readings to keep; None falls back to RETENTION_RAW_DAYS
+    retention_days = db.Column(db.Integer, nullable=True)
 
     def to_json(self):
         return {
             "id": self.id,
             "name": self.name,
             "ipAddress": self.ip_address,
+            "retentionDays": self.retention_days,
         }
 
 
 class SensorData(db.Model):
     __tablename__ = 'sensor_data'
+    __table_args__ = (
+        # Serves per-sensor time-range scans in timestamp order and (timestamp, id) keyset pagination
+        db.Index('ix_sensor_data_sensor_id_timestamp', 'sensor_id', 'timestamp', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     temperature = db.Column(db.Float, nullable=False)
     humidity = db.Column(db.Float, nullable=False)
     pressure = db.Column(db.Float, nullable=True)
     light_level = db.Column(db.Float, nullable=True)
-    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.now(timezone.utc))
+    timestamp = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'), nullable=False)
 
     def to_json(self):
@@ -80,4 +88,86 @@ class SensorData(db.Model):
             "lightLevel": self.light_level,
             "timestamp": self.timestamp.isoformat(),
             "sensorId": self.sensor_id,
-        }
\ No newline at end of file
+        }
+
+
+class SensorRollup(db.Model):
+    """
+    Pre-aggregated statistics for one sensor over one time bucket.
+    Resolution is one of '1m', '1h' or '1d'; bucket is the bucket's start time (UTC).
+    Sums and counts are stored instead of averages so buckets can be merged incrementally.
+    """
+
+    __tablename__ = 'sensor_rollups'
+    # Rows are looked up and range-scanned by primary key only, so store them clustered on it
+    __table_args__ = {'sqlite_with_rowid': False}
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'), primary_key=True)
+    resolution = db.Column(db.String(2), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    temperature_min = db.Column(db.Float, nullable=True)
+    temperature_max = db.Column(db.Float, nullable=True)
+    temperature_sum = db.Column(db.Float, nullable=False, default=0.0)
+    temperature_count = db.Column(db.Integer, nullable=False, default=0)
+    humidity_min = db.Column(db.Float, nullable=True)
+    humidity_max = db.Column(db.Float, nullable=True)
+    humidity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    humidity_count = db.Column(db.Integer, nullable=False, default=0)
+    pressure_min = db.Column(db.Float, nullable=True)
+    pressure_max = db.Column(db.Float, nullable=True)
+    pressure_sum = db.Column(db.Float, nullable=False, default=0.0)
+    pressure_count = db.Column(db.Integer, nullable=False, default=0)
+    light_level_min = db.Column(db.Float, nullable=True)
+    light_level_max = db.Column(db.Float, nullable=True)
+    light_level_sum = db.Column(db.Float, nullable=False, default=0.0)
+    light_level_count = db.Column(db.Integer, nullable=False, default=0)
+
+    METRICS = {
+        "temperature": "temperature",
+        "humidity": "humidity",
+        "pressure": "pressure",
+        "lightLevel": "light_level",
+    }
+
+    def to_json(self):
+        result = {
+            "bucket": self.bucket.isoformat(),
+            "count": self.count,
+        }
+        for key, column in self.METRICS.items():
+            count = getattr(self, f"{column}_count")
+            result[key] = {
+                "min": getattr(self, f"{column}_min"),
+                "max": getattr(self, f"{column}_max"),
+                "avg": getattr(self, f"{column}_sum") / count if count else None,
+                "count": count,
+            }
+        return result
+
+
+class SensorLatest(db.Model):
+    """
+    Snapshot of the most recent reading of each sensor, one row per sensor, kept
+    current by every write path so "what is every sensor reading now" is a
+    primary key scan instead of a sort over each sensor's history.
+    """
+
+    __tablename__ = 'sensor_latest'
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'), primary_key=True)
+    data_id = db.Column(db.Integer, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    temperature = db.Column(db.Float, nullable=False)
+    humidity = db.Column(db.Float, nullable=False)
+    pressure = db.Column(db.Float, nullable=True)
+    light_level = db.Column(db.Float, nullable=True)
+
+    def to_json(self):
+        return {
+            "id": self.data_id,
+            "temperature": self.temperature,
+            "humidity": self.humidity,
+            "pressure": self.pressure,
+            "lightLevel": self.light_level,
+            "timestamp": self.timestamp.isoformat(),
+            "sensorId": self.sensor_id,
+        }
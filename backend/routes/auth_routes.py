@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify
+from config import password_pool
 from models import User, db
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, current_user, jwt_required, get_jwt_identity
+from utils.passwords import PasswordPoolBusy
+from utils.user_cache import user_cache
 
 auth_bp = Blueprint('auth_bp', __name__)
 
 
+@auth_bp.errorhandler(PasswordPoolBusy)
+def password_pool_busy(_error):
+    response = jsonify({"message": "Too many concurrent password checks, retry later."})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user
@@ -43,6 +53,7 @@ def register():
     responses:
       201: {description: 'User created successfully'}
       400: {description: 'Invalid input or user already exists'}
+      503: {description: 'Password hashing is at capacity, retry after the Retry-After delay'}
     """
     data = request.get_json()
     username = data.get('username')
@@ -59,7 +70,8 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"message": "Email already exists"}), 400
 
-    new_user = User(username=username, password=password, first_name=first_name, last_name=last_name, email=email)
+    password_hash = password_pool.hash(password)
+    new_user = User(username=username, password_hash=password_hash, first_name=first_name, last_name=last_name, email=email)
     db.session.add(new_user)
     db.session.commit()
 
@@ -106,6 +118,7 @@ def login():
               firstName: "Admin"
               lastName: "UserOne"
       401: {description: 'Invalid username or password'}
+      503: {description: 'Password verification is at capacity, retry after the Retry-After delay'}
     """
     data = request.get_json()
     username = data.get('username')
@@ -113,7 +126,15 @@ def login():
 
     user = User.query.filter_by(username=username).first()
 
-    if user and user.check_password(password):
+    valid = False
+    if user and password:
+        valid, new_hash = password_pool.verify_and_update(user.password_hash, password)
+        if new_hash is not None:
+            # Stored with an outdated method or cost; upgrade now that the plain password is known
+            user.password_hash = new_hash
+            db.session.commit()
+
+    if valid:
         access_token = create_access_token(identity=str(user.id))
         refresh_token = create_refresh_token(identity=str(user.id))
         return jsonify(accessToken=access_token, refreshToken=refresh_token, user=user.to_json())
@@ -151,13 +172,10 @@ def profile():
             lastName: "UserOne"
             username: "admin1"
           # You can define the full user schema here if desired
-      404: {description: 'User not found'}
+      401: {description: 'Missing or invalid token, or the user no longer exists'}
     """
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"message": "User not found"}), 404
-    return jsonify(user.to_json()), 200
+    # Served from the user cache by the JWT user_lookup_loader, no query needed
+    return jsonify(current_user.to_json()), 200
 
 
 @auth_bp.route('/change_password', methods=['PATCH'])
@@ -190,18 +208,17 @@ def change_password():
       200: {description: 'Password updated successfully'}
       400: {description: 'Missing password fields'}
       401: {description: 'Invalid current password'}
+      503: {description: 'Password hashing is at capacity, retry after the Retry-After delay'}
     """
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"message": "User not found"}), 404
+    user = db.session.get(User, current_user.id)
     data = request.get_json()
     current_password = data.get('currentPassword')
     new_password = data.get('newPassword')
     if not current_password or not new_password:
         return jsonify({"message": "Current password and new password are required"}), 400
-    if not user.check_password(current_password):
+    if not password_pool.verify(user.password_hash, current_password):
         return jsonify({"message": "Invalid current password"}), 401
-    user.password = new_password
+    user.password_hash = password_pool.hash(new_password)
     db.session.commit()
+    user_cache.invalidate(user.id)
     return jsonify({"message": "Password updated successfully"}), 200
\ No newline at end of file
@@ -0,0 +1,125 @@
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
+from utils.export_data import EXPORT_FORMATS, parquet_available, stream_export
+from utils.import_data import IMPORT_FORMATS, ImportFailed, import_records, iter_records
+from utils.timeseries import parse_timestamp
+
+bulk_bp = Blueprint('bulk_bp', __name__)
+
+
+@bulk_bp.route("/export/sensor_data", methods=["GET"])
+@jwt_required(locations=["headers"])
+def export_sensor_data():
+    """Export sensor history as CSV, NDJSON or Parquet
+    The export is streamed from a database cursor in chunks, so memory use on
+    the server does not depend on the size of the export.
+    ---
+    tags:
+      - Sensor Data
+    security:
+      - Bearer: []
+    produces:
+      - text/csv
+      - application/x-ndjson
+      - application/vnd.apache.parquet
+    parameters:
+      - name: sensorIds
+        in: query
+        type: string
+        description: Comma-separated sensor IDs. Defaults to all sensors.
+      - name: from
+        in: query
+        type: string
+        format: date-time
+      - name: to
+        in: query
+        type: string
+        format: date-time
+      - name: format
+        in: query
+        type: string
+        enum: [csv, ndjson, parquet]
+        default: csv
+    responses:
+      200: {description: 'The exported readings, ordered by sensor and time'}
+      400: {description: 'Invalid query parameters'}
+      501: {description: 'Parquet requested but pyarrow is not installed'}
+    """
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(EXPORT_FORMATS)}."}), 400
+    if fmt == "parquet" and not parquet_available():
+        return jsonify({"message": "Parquet export is not available on this server."}), 501
+    try:
+        sensor_ids = [int(value) for value in request.args.get("sensorIds", "").split(",") if value.strip()]
+        start = parse_timestamp(request.args["from"]) if "from" in request.args else None
+        end = parse_timestamp(request.args["to"]) if "to" in request.args else None
+    except ValueError:
+        return jsonify({"message": "sensorIds must be integers and from/to ISO-8601 date-times."}), 400
+
+    filename = f"sensor_data.{fmt}"
+    return Response(
+        stream_with_context(stream_export(fmt, sensor_ids, start, end)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@bulk_bp.route("/import/sensor_data", methods=["POST"])
+@jwt_required(locations=["headers"])
+def import_sensor_data():
+    """Bulk import historical readings from a CSV or NDJSON upload
+    The body is parsed as it streams in and committed in chunks. If the import
+    stops part-way, re-send the same file with resumeFrom set to the returned
+    offset. Send the file either as the raw request body or as a multipart
+    field named "file". CSV headers and NDJSON keys may use the export names
+    (sensor_id, light_level) or the API names (sensorId, lightLevel).
+    ---
+    tags:
+      - Sensor Data
+    security:
+      - Bearer: []
+    consumes:
+      - text/csv
+      - application/x-ndjson
+      - multipart/form-data
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [csv, ndjson]
+        required: true
+      - name: resumeFrom
+        in: query
+        type: integer
+        default: 0
+        description: Number of records of this file that were already imported.
+    responses:
+      200:
+        description: Import finished
+        examples:
+          application/json:
+            offset: 250000
+            inserted: 249998
+            rejected: 2
+            rowsPerSecond: 180000
+            errors:
+              - {record: 17, message: "temperature must be a number."}
+              - {record: 9001, message: "Sensor with id 42 not found."}
+      400: {description: 'Invalid query parameters'}
+      500: {description: 'Import stopped; the body includes the offset to resume from'}
+    """
+    fmt = request.args.get("format")
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(IMPORT_FORMATS)}."}), 400
+    resume_from = request.args.get("resumeFrom", "0")
+    if not resume_from.isdigit():
+        return jsonify({"message": "resumeFrom must be a non-negative integer."}), 400
+
+    upload = request.files.get("file")
+    stream = upload.stream if upload is not None else request.stream
+    try:
+        result = import_records(iter_records(stream, fmt), int(resume_from), current_app.config["IMPORT_CHUNK_SIZE"])
+    except ImportFailed as e:
+        return jsonify({"message": str(e), "offset": e.offset}), 500
+    return jsonify(result.to_json()), 200
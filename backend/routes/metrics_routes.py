@@ -0,0 +1,26 @@
+from flask import Blueprint, Response, abort
+from config import request_metrics
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Request metrics in Prometheus text format
+    This is a public endpoint meant for a Prometheus scraper. Per endpoint and
+    method it reports a latency histogram, responses by status, SQL statements
+    executed, time spent in SQL, rows returned and response bytes. Counters are
+    kept per server process.
+    ---
+    tags:
+      - Monitoring
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Metrics in the Prometheus exposition format (version 0.0.4).
+      404: {description: 'Metrics are disabled (METRICS_ENABLED=0)'}
+    """
+    if not request_metrics.enabled:
+        abort(404)
+    return Response(request_metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,85 @@
+from flask import Blueprint, abort, jsonify, request, send_file
+from flask_jwt_extended import current_user, verify_jwt_in_request
+from config import request_profiler
+
+profiling_bp = Blueprint('profiling_bp', __name__)
+
+
+@profiling_bp.before_request
+def require_admin():
+    # Checked before the token, so a disabled profiler does not reveal its endpoints with a 401
+    if not request_profiler.enabled:
+        abort(404)
+    verify_jwt_in_request(locations=["headers"])
+    if not current_user.is_admin:
+        return jsonify({"message": "Admin access required."}), 403
+    return None
+
+
+@profiling_bp.route("/profiles", methods=["GET"])
+def list_profiles():
+    """List stored request profiles
+    Profiles are recorded when an admin sends a request with the header
+    `X-Profile: cprofile` or `X-Profile: sample` (or the query parameter
+    profile=...) while PROFILING_ENABLED is on. The response of the profiled
+    request carries an X-Profile-Id header. Admin only.
+    ---
+    tags:
+      - Monitoring
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Stored profiles, newest first, without the SQL statements.
+      403: {description: 'Not an admin'}
+      404: {description: 'Profiling is disabled (PROFILING_ENABLED=0)'}
+    """
+    profiles = []
+    for profile_id in request_profiler.list_ids():
+        summary = request_profiler.summary(profile_id)
+        if summary is None:
+            continue
+        summary.pop("report")
+        summary["statementCount"] = len(summary.pop("statements"))
+        profiles.append(summary)
+    return jsonify({"profiles": profiles})
+
+
+@profiling_bp.route("/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """Get one request profile
+    Returns the request's timing, every SQL statement it executed with its
+    duration, and a report: the top functions by cumulative time for cProfile,
+    folded stacks for the sampler. With raw=1 the profile file itself is
+    downloaded: a .pstats file for `python -m pstats` or snakeviz, or a
+    .folded file for flamegraph.pl or speedscope. Admin only.
+    ---
+    tags:
+      - Monitoring
+    security:
+      - Bearer: []
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+      - name: raw
+        in: query
+        type: integer
+        enum: [0, 1]
+        default: 0
+    responses:
+      200:
+        description: Profile summary, or the raw profile file with raw=1.
+      403: {description: 'Not an admin'}
+      404: {description: 'Profile not found or profiling disabled'}
+    """
+    if request.args.get("raw") == "1":
+        path = request_profiler.raw_path(profile_id)
+        if path is None:
+            return jsonify({"message": "Profile not found"}), 404
+        return send_file(path, as_attachment=True, mimetype="application/octet-stream")
+    summary = request_profiler.summary(profile_id)
+    if summary is None:
+        return jsonify({"message": "Profile not found"}), 404
+    return jsonify(summary)
@@ -1,18 +1,103 @@
-from flask import Blueprint, request, jsonify
-from models import Sensor, SensorData, db
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import timedelta
+from flask import Blueprint, request, jsonify, current_app
+from config import response_cache
+from models import Sensor, SensorData, SensorLatest, SensorRollup, User, db
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import and_, delete, or_, func, update
+from sqlalchemy.orm import joinedload
+from utils.ingest import ReadingError, _parse_number, parse_reading, ingest_batch, ingest_queue, insert_readings, readings_committed
+from utils.latest import refresh_latest
+from utils.partitions import oldest_timestamp_expression, physical_tables, sensor_data_entity, table_for_timestamp, time_bounds
+from utils.analytics import ANOMALY_METHODS, analyze, series_json
+from utils.downsample import lttb, min_max_buckets
+from utils.rollups import METRIC_COLUMNS as ROLLUP_METRIC_COLUMNS, RESOLUTIONS, adjust_rollups, bucket_expression, epoch_bucket_expression
+from utils.serialization import SENSOR_COLUMNS, DATA_POINT_COLUMNS, sensor_json, data_point_json, data_points_json, data_points_columnar
+from utils.timeseries import EPOCH, parse_timestamp, encode_cursor, decode_cursor, epoch_seconds, utc_now
 
 sensor_bp = Blueprint('sensor_bp', __name__)
 
 
 # --- Public Sensor Routes ---
+SENSOR_INCLUDES = ("owner", "latest", "count")
+# Same order as DATA_POINT_COLUMNS so rows can go through data_points_json
+LATEST_COLUMNS = [
+    SensorLatest.data_id,
+    SensorLatest.temperature,
+    SensorLatest.humidity,
+    SensorLatest.pressure,
+    SensorLatest.light_level,
+    SensorLatest.timestamp,
+    SensorLatest.sensor_id,
+]
+
+
+def _include_arg():
+    include = {name.strip() for name in request.args.get("include", "").split(",") if name.strip()}
+    unknown = include - set(SENSOR_INCLUDES)
+    if unknown:
+        raise ValueError(f"include accepts: {', '.join(SENSOR_INCLUDES)}.")
+    return include
+
+
+def _sensor_list_tags():
+    # Latest readings and counts change with every write, not only with sensor edits
+    if {"latest", "count"} & set(request.args.get("include", "").split(",")):
+        return ["sensors", "sensor_data"]
+    return ["sensors"]
+
+
+def _sensor_list_query(include):
+    """
+    One SELECT for the whole listing, whatever is included, so the number of
+    round trips does not grow with the number of sensors. The latest reading
+    comes from the sensor_latest snapshot and the count is a correlated sum over
+    the daily rollups, one primary key range per sensor; both are kept exact by
+    every write path. Daily rollups outlive raw retention, so the sum starts at
+    the day of the oldest stored reading; retention only removes whole days.
+    """
+    columns = list(SENSOR_COLUMNS)
+    joins = []
+    if "owner" in include:
+        columns += [User.first_name, User.last_name]
+        joins.append((User, Sensor.user_id == User.id, False))
+    if "count" in include:
+        columns.append(
+            db.select(func.coalesce(func.sum(SensorRollup.count), 0))
+            .where(
+                SensorRollup.sensor_id == Sensor.id,
+                SensorRollup.resolution == "1d",
+                SensorRollup.bucket >= bucket_expression("1d", oldest_timestamp_expression(Sensor.id)),
+            )
+            .scalar_subquery()
+        )
+    if "latest" in include:
+        columns += LATEST_COLUMNS
+        joins.append((SensorLatest, SensorLatest.sensor_id == Sensor.id, True))
+
+    query = db.select(*columns).select_from(Sensor)
+    for target, condition, outer in joins:
+        query = query.join(target, condition, isouter=outer)
+    return query.order_by(Sensor.id)
+
+
 @sensor_bp.route("/sensors", methods=["GET"])
+@response_cache.cached(_sensor_list_tags)
 def get_sensors():
     """Get a list of all sensors
-    This is a public endpoint.
+    This is a public endpoint. Optional details are fetched in the same query,
+    so the cost stays one round trip however many sensors there are.
     ---
     tags:
       - Sensors
+    parameters:
+      - name: include
+        in: query
+        type: string
+        description: >
+          Comma-separated extras per sensor: owner (ownerName), latest (the most
+          recent data point, or null) and count (readingCount, the number of
+          readings currently stored; expired readings are not counted).
+        example: owner,latest,count
     responses:
       200:
         description: A list of sensors
@@ -31,16 +116,119 @@ def get_sensors():
                 name: "Garage Humidity"
                 ip_address: "192.168.1.102"
                 user_id: 2
+      400: {description: 'Unknown include option'}
+    """
+    try:
+        include = _include_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    rows = db.session.execute(_sensor_list_query(include)).all()
+    sensors = []
+    for row in rows:
+        sensor = sensor_json(row)
+        position = len(SENSOR_COLUMNS)
+        if "owner" in include:
+            sensor["ownerName"] = f"{row[position]} {row[position + 1]}"
+            position += 2
+        if "count" in include:
+            sensor["readingCount"] = row[position]
+            position += 1
+        if "latest" in include:
+            latest = row[position:position + len(LATEST_COLUMNS)]
+            sensor["latest"] = data_points_json([latest])[0] if latest[0] is not None else None
+        sensors.append(sensor)
+    return jsonify({"sensors": sensors})
+
+
+@sensor_bp.route("/sensors/latest", methods=["GET"])
+@response_cache.cached(lambda: ["sensors", "sensor_data"])
+def fleet_overview():
+    """Current reading of every sensor
+    This is a public endpoint. Answered from the sensor_latest snapshot with one
+    indexed read, so its cost does not depend on how much history is stored.
+    ---
+    tags:
+      - Sensors
+    responses:
+      200:
+        description: Every sensor with its most recent data point (null if it has none)
+        examples:
+          application/json:
+            sensors:
+              - id: 1
+                name: "Living Room Temp"
+                ipAddress: "192.168.1.101"
+                latest:
+                  id: 101
+                  sensorId: 1
+                  temperature: 22.5
+                  humidity: 45.2
+                  pressure: 1012.5
+                  lightLevel: 550.0
+                  timestamp: "2025-11-13T10:30:00"
+            reporting: 1
     """
-    sensors = Sensor.query.all()
-    json_sensors = list(map(lambda x: x.to_json(), sensors))
-    return jsonify({"sensors": json_sensors})
+    rows = db.session.execute(
+        db.select(*SENSOR_COLUMNS, *LATEST_COLUMNS)
+        .select_from(Sensor)
+        .outerjoin(SensorLatest, SensorLatest.sensor_id == Sensor.id)
+        .order_by(Sensor.id)
+    ).all()
+    sensors = []
+    for row in rows:
+        sensor = sensor_json(row)
+        latest = row[len(SENSOR_COLUMNS):]
+        sensor["latest"] = data_points_json([latest])[0] if latest[0] is not None else None
+        sensors.append(sensor)
+    return jsonify({"sensors": sensors, "reporting": sum(1 for sensor in sensors if sensor["latest"])})
+
+
+DOWNSAMPLE_MODES = ("minmax", "lttb")
+# LTTB chooses among this many min/max candidates per output point rather than among every row
+LTTB_CANDIDATES_PER_POINT = 8
+RESPONSE_SHAPES = ("rows", "columnar")
+METRIC_COLUMNS = {
+    "temperature": "temperature",
+    "humidity": "humidity",
+    "pressure": "pressure",
+    "lightLevel": "light_level",
+}
+MAX_PAGE_SIZE = 10000
+MAX_DOWNSAMPLE_POINTS = 10000
+MAX_ANOMALIES_LISTED = 1000
+COMPARE_AGGREGATES = ("avg", "min", "max", "count")
+MAX_COMPARE_SENSORS = 1000
+MAX_COMPARE_BUCKETS = 5000
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _positive_int_arg(name, maximum):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} must be a positive integer.")
+    return min(int(value), maximum)
+
+
+def _timestamp_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO-8601 date-time.")
 
 
 @sensor_bp.route("/details_sensor/<int:sensor_id>", methods=["GET"])
+@response_cache.cached(lambda sensor_id: [f"sensor:{sensor_id}"])
 def details_sensor(sensor_id):
     """Get detailed information for a single sensor, including its data points
-    This is a public endpoint.
+    This is a public endpoint. Without query parameters every data point is
+    returned. Use from/to to select a time window, limit/cursor to page through
+    it, or downsample to reduce it to a target number of points for charting.
     ---
     tags:
       - Sensors
@@ -50,6 +238,53 @@ def details_sensor(sensor_id):
         type: integer
         required: true
         description: The ID of the sensor to retrieve.
+      - name: from
+        in: query
+        type: string
+        format: date-time
+        description: Only include data points at or after this time.
+      - name: to
+        in: query
+        type: string
+        format: date-time
+        description: Only include data points before this time.
+      - name: limit
+        in: query
+        type: integer
+        description: Page size. The response includes nextCursor when more data points exist.
+      - name: cursor
+        in: query
+        type: string
+        description: The nextCursor value returned by the previous page.
+      - name: downsample
+        in: query
+        type: integer
+        description: Target number of data points. Cannot be combined with limit/cursor.
+      - name: mode
+        in: query
+        type: string
+        enum: [minmax, lttb]
+        default: minmax
+        description: >
+          Downsampling algorithm. Both stream the window and keep memory bounded
+          by the target: minmax keeps the lowest and highest reading of equal-width
+          time buckets, lttb runs Largest-Triangle-Three-Buckets over a finer
+          min/max selection.
+      - name: metric
+        in: query
+        type: string
+        enum: [temperature, humidity, pressure, lightLevel]
+        default: temperature
+        description: The series the downsampling algorithm preserves.
+      - name: shape
+        in: query
+        type: string
+        enum: [rows, columnar]
+        default: rows
+        description: >
+          rows returns dataPoints as a list of objects. columnar returns a series
+          object with one array per field (ids, timestamps, temperature, humidity,
+          pressure, lightLevel), which is smaller and maps directly onto chart datasets.
     responses:
       200:
         description: Detailed information about the sensor.
@@ -70,17 +305,496 @@ def details_sensor(sensor_id):
                 pressure: 1012.5
                 lightLevel: 550.0
                 timestamp: "2025-11-13T10:30:00"
+            nextCursor: "MjAyNS0xMS0xM1QxMDozMDowMHwxMDE"
+      400: {description: 'Invalid query parameters'}
       404: {description: 'Sensor not found'}
     """
-    sensor = Sensor.query.get_or_404(sensor_id, description="Sensor not found")
+    try:
+        start = _timestamp_arg("from")
+        end = _timestamp_arg("to")
+        limit = _positive_int_arg("limit", MAX_PAGE_SIZE)
+        downsample = _positive_int_arg("downsample", MAX_DOWNSAMPLE_POINTS)
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            cursor = decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    mode = request.args.get("mode", "minmax")
+    metric = request.args.get("metric", "temperature")
+    shape = request.args.get("shape", "rows")
+    if shape not in RESPONSE_SHAPES:
+        return jsonify({"message": f"shape must be one of: {', '.join(RESPONSE_SHAPES)}."}), 400
+    if mode not in DOWNSAMPLE_MODES:
+        return jsonify({"message": f"mode must be one of: {', '.join(DOWNSAMPLE_MODES)}."}), 400
+    if metric not in METRIC_COLUMNS:
+        return jsonify({"message": f"metric must be one of: {', '.join(METRIC_COLUMNS)}."}), 400
+    if downsample and (limit or cursor):
+        return jsonify({"message": "downsample cannot be combined with limit or cursor."}), 400
+
+    sensor = db.first_or_404(
+        db.select(Sensor).options(joinedload(Sensor.owner)).where(Sensor.id == sensor_id),
+        description="Sensor not found",
+    )
     sensor_details = sensor.to_json()
-    data_points = SensorData.query.filter_by(sensor_id=sensor_id).order_by(SensorData.timestamp.asc()).all()
-    sensor_details["dataPoints"] = [data.to_json() for data in data_points]
+
+    # Only the partitions that overlap [from or cursor, to) are read
+    lower = start
+    if cursor is not None and (lower is None or cursor[0] > lower):
+        lower = cursor[0]
+    Data = sensor_data_entity(lower, end)
+    query = db.select(*[getattr(Data, column.key) for column in DATA_POINT_COLUMNS]).where(Data.sensor_id == sensor_id)
+    if start is not None:
+        query = query.where(Data.timestamp >= start)
+    if end is not None:
+        query = query.where(Data.timestamp < end)
+    if cursor is not None:
+        cursor_timestamp, cursor_id = cursor
+        query = query.where(or_(
+            Data.timestamp > cursor_timestamp,
+            and_(Data.timestamp == cursor_timestamp, Data.id > cursor_id),
+        ))
+    query = query.order_by(Data.timestamp.asc(), Data.id.asc())
+
+    next_cursor = None
+    if limit:
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    elif downsample:
+        column = METRIC_COLUMNS[metric]
+        x = lambda row: epoch_seconds(row.timestamp)
+        y = lambda row: getattr(row, column)
+        bounds = time_bounds(sensor_id)
+        low, high = start or bounds[0], end or bounds[1]
+        if low is None or high is None:
+            rows = []
+        else:
+            stream = db.session.execute(query.execution_options(yield_per=5000))
+            if mode == "lttb":
+                candidates = min_max_buckets(
+                    stream, downsample * LTTB_CANDIDATES_PER_POINT, epoch_seconds(low), epoch_seconds(high), x, y
+                )
+                rows = lttb(candidates, downsample, x, y)
+            else:
+                rows = min_max_buckets(stream, downsample, epoch_seconds(low), epoch_seconds(high), x, y)
+    else:
+        rows = db.session.execute(query).all()
+
+    if shape == "columnar":
+        sensor_details["series"] = data_points_columnar(rows)
+    else:
+        sensor_details["dataPoints"] = data_points_json(rows)
+    if limit:
+        sensor_details["nextCursor"] = next_cursor
     sensor_details["ownerName"] = f"{sensor.owner.first_name} {sensor.owner.last_name}"
     return jsonify(sensor_details), 200
 
 
+@sensor_bp.route("/sensor_aggregates/<int:sensor_id>", methods=["GET"])
+@response_cache.cached(lambda sensor_id: [f"sensor:{sensor_id}"])
+def sensor_aggregates(sensor_id):
+    """Get pre-aggregated statistics for a sensor
+    This is a public endpoint. Statistics are read from rollup tables, so the
+    cost depends on the number of buckets, not on the number of raw readings.
+    ---
+    tags:
+      - Sensors
+    parameters:
+      - name: sensor_id
+        in: path
+        type: integer
+        required: true
+      - name: resolution
+        in: query
+        type: string
+        enum: [1m, 1h, 1d]
+        default: 1h
+      - name: from
+        in: query
+        type: string
+        format: date-time
+        description: Only include buckets starting at or after this time.
+      - name: to
+        in: query
+        type: string
+        format: date-time
+        description: Only include buckets starting before this time.
+    responses:
+      200:
+        description: One entry per non-empty bucket, in time order.
+        examples:
+          application/json:
+            sensorId: 1
+            resolution: "1h"
+            buckets:
+              - bucket: "2025-11-13T10:00:00"
+                count: 60
+                temperature: {min: 21.2, max: 23.9, avg: 22.4, count: 60}
+                humidity: {min: 44.0, max: 47.1, avg: 45.3, count: 60}
+                pressure: {min: 1011.8, max: 1012.9, avg: 1012.2, count: 60}
+                lightLevel: {min: null, max: null, avg: null, count: 0}
+      400: {description: 'Invalid query parameters'}
+      404: {description: 'Sensor not found'}
+    """
+    resolution = request.args.get("resolution", "1h")
+    if resolution not in RESOLUTIONS:
+        return jsonify({"message": f"resolution must be one of: {', '.join(RESOLUTIONS)}."}), 400
+    try:
+        start = _timestamp_arg("from")
+        end = _timestamp_arg("to")
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    Sensor.query.get_or_404(sensor_id, description="Sensor not found")
+
+    query = SensorRollup.query.filter_by(sensor_id=sensor_id, resolution=resolution)
+    if start is not None:
+        query = query.filter(SensorRollup.bucket >= start)
+    if end is not None:
+        query = query.filter(SensorRollup.bucket < end)
+    rollups = query.order_by(SensorRollup.bucket.asc()).all()
+    return jsonify({
+        "sensorId": sensor_id,
+        "resolution": resolution,
+        "buckets": [rollup.to_json() for rollup in rollups],
+    }), 200
+
+
+@sensor_bp.route("/sensor_analytics/<int:sensor_id>", methods=["GET"])
+@response_cache.cached(lambda sensor_id: [f"sensor:{sensor_id}"])
+def sensor_analytics(sensor_id):
+    """Get statistics and anomalies of one metric over a time window
+    This is a public endpoint. The metric's readings in the window are fetched
+    in one query and analysed server side: summary statistics, percentiles,
+    rate of change and an anomaly score for every reading. Responses are cached
+    per window until the sensor's data changes.
+    ---
+    tags:
+      - Sensors
+    parameters:
+      - name: sensor_id
+        in: path
+        type: integer
+        required: true
+      - name: metric
+        in: query
+        type: string
+        enum: [temperature, humidity, pressure, lightLevel]
+        default: temperature
+      - name: from
+        in: query
+        type: string
+        format: date-time
+        description: Only include readings at or after this time.
+      - name: to
+        in: query
+        type: string
+        format: date-time
+        description: Only include readings before this time.
+      - name: method
+        in: query
+        type: string
+        enum: [ewma, zscore]
+        default: ewma
+        description: >
+          zscore scores each reading against the mean and standard deviation of the
+          whole window. ewma scores it against an exponentially weighted mean and
+          deviation of the readings before it, which follows trends and daily cycles.
+      - name: threshold
+        in: query
+        type: number
+        default: 3
+        description: Readings scoring above this many standard deviations are anomalies.
+      - name: span
+        in: query
+        type: integer
+        default: 20
+        description: EWMA span in readings (smoothing factor 2 / (span + 1)).
+      - name: series
+        in: query
+        type: integer
+        enum: [0, 1]
+        default: 0
+        description: With 1, also return rate, score and anomaly flag for every reading as columnar arrays.
+    responses:
+      200:
+        description: Statistics of the window and its anomalous readings, in time order.
+        examples:
+          application/json:
+            sensorId: 1
+            metric: "temperature"
+            method: "ewma"
+            statistics:
+              count: 1440
+              mean: 21.7
+              stddev: 2.1
+              min: 17.9
+              max: 26.3
+              percentiles: {p5: 18.6, p25: 19.9, p50: 21.6, p75: 23.5, p95: 25.1, p99: 25.9}
+              rateOfChange: {meanPerSecond: 0.0, minPerSecond: -0.004, maxPerSecond: 0.005, meanAbsPerSecond: 0.0011}
+              anomalyCount: 1
+            anomalies:
+              - timestamp: "2025-11-13T10:30:00"
+                value: 35.2
+                score: 7.4
+      400: {description: 'Invalid query parameters, or more readings than ANALYTICS_MAX_POINTS'}
+      404: {description: 'Sensor not found'}
+    """
+    metric = request.args.get("metric", "temperature")
+    method = request.args.get("method", "ewma")
+    if metric not in METRIC_COLUMNS:
+        return jsonify({"message": f"metric must be one of: {', '.join(METRIC_COLUMNS)}."}), 400
+    if method not in ANOMALY_METHODS:
+        return jsonify({"message": f"method must be one of: {', '.join(ANOMALY_METHODS)}."}), 400
+    try:
+        start = _timestamp_arg("from")
+        end = _timestamp_arg("to")
+        span = _positive_int_arg("span", 10000) or 20
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        threshold = float(request.args.get("threshold", 3))
+    except ValueError:
+        threshold = None
+    if threshold is None or not 0 < threshold < float("inf"):
+        return jsonify({"message": "threshold must be a positive number."}), 400
+    if span < 2:
+        return jsonify({"message": "span must be at least 2."}), 400
+    Sensor.query.get_or_404(sensor_id, description="Sensor not found")
+
+    Data = sensor_data_entity(start, end)
+    column = getattr(Data, METRIC_COLUMNS[metric])
+    query = db.select(Data.timestamp, column).where(Data.sensor_id == sensor_id, column.is_not(None))
+    if start is not None:
+        query = query.where(Data.timestamp >= start)
+    if end is not None:
+        query = query.where(Data.timestamp < end)
+    max_points = current_app.config["ANALYTICS_MAX_POINTS"]
+    rows = db.session.execute(query.order_by(Data.timestamp.asc(), Data.id.asc()).limit(max_points + 1)).all()
+    if len(rows) > max_points:
+        return jsonify({"message": f"The window holds more than {max_points} readings, narrow it with from/to."}), 400
+
+    timestamps, values = (list(column) for column in zip(*rows)) if rows else ([], [])
+    statistics, rates, scores, anomalies = analyze(timestamps, values, method, threshold, span)
+    result = {
+        "sensorId": sensor_id,
+        "metric": metric,
+        "method": method,
+        "threshold": threshold,
+        "span": span,
+        "statistics": statistics,
+        "anomalies": [
+            {"timestamp": timestamps[i], "value": values[i], "score": float(scores[i])}
+            for i in anomalies.nonzero()[0][:MAX_ANOMALIES_LISTED].tolist()
+        ],
+    }
+    if request.args.get("series") == "1":
+        result["series"] = series_json(timestamps, values, rates, scores, anomalies)
+    return jsonify(result), 200
+
+
+def _duration_arg(name, default):
+    value = request.args.get(name, default)
+    unit = DURATION_UNITS.get(value[-1:])
+    if unit is None or not value[:-1].isdigit() or int(value[:-1]) < 1:
+        raise ValueError(f"{name} must be a duration such as 30s, 15m, 1h or 1d.")
+    return int(value[:-1]) * unit
+
+
+def _compare_source(width, start):
+    """
+    Picks what the comparison aggregates: the coarsest rollup resolution that
+    divides the bucket width (its buckets nest exactly inside the requested
+    ones), or raw readings for widths below a minute or not a whole number of minutes.
+    1-minute rollups are only used while they are all still retained for the window.
+    """
+    for resolution in ("1d", "1h", "1m"):
+        if width % RESOLUTIONS[resolution]:
+            continue
+        rollup_days = current_app.config["RETENTION_1M_ROLLUP_DAYS"]
+        if resolution == "1m" and rollup_days and start < utc_now() - timedelta(days=rollup_days):
+            return None
+        return resolution
+    return None
+
+
+def _compare_query(sensor_ids, column, aggregate, width, start, end, resolution):
+    """
+    One grouped SELECT of (sensor_id, bucket epoch, value) over every sensor at once.
+    """
+    if resolution is not None:
+        bucket = epoch_bucket_expression(SensorRollup.bucket, width)
+        value_sum = func.sum(getattr(SensorRollup, f"{column}_sum"))
+        value_count = func.sum(getattr(SensorRollup, f"{column}_count"))
+        value = {
+            "avg": value_sum / func.nullif(value_count, 0),
+            "min": func.min(getattr(SensorRollup, f"{column}_min")),
+            "max": func.max(getattr(SensorRollup, f"{column}_max")),
+            "count": value_count,
+        }[aggregate]
+        return (
+            db.select(SensorRollup.sensor_id, bucket, value)
+            .where(
+                SensorRollup.sensor_id.in_(sensor_ids),
+                SensorRollup.resolution == resolution,
+                SensorRollup.bucket >= start,
+                SensorRollup.bucket < end,
+            )
+            .group_by(SensorRollup.sensor_id, bucket)
+        )
+    Data = sensor_data_entity(start, end)
+    bucket = epoch_bucket_expression(Data.timestamp, width)
+    metric = getattr(Data, column)
+    value = {"avg": func.avg, "min": func.min, "max": func.max, "count": func.count}[aggregate](metric)
+    return (
+        db.select(Data.sensor_id, bucket, value)
+        .where(Data.sensor_id.in_(sensor_ids), Data.timestamp >= start, Data.timestamp < end)
+        .group_by(Data.sensor_id, bucket)
+    )
+
+
+@sensor_bp.route("/sensors/compare", methods=["GET"])
+@response_cache.cached(lambda: ["sensors", "sensor_data"])
+def compare_sensors():
+    """Compare one metric across many sensors in aligned time buckets
+    This is a public endpoint. Every sensor is aggregated in one grouped query
+    into the same epoch-aligned buckets, and the result is returned as a matrix
+    with one row of values per sensor and one column per bucket. Bucket widths
+    that are whole minutes are answered from the rollup tables, so the cost
+    depends on the number of buckets rather than on the number of readings.
+    ---
+    tags:
+      - Sensors
+    parameters:
+      - name: ids
+        in: query
+        type: string
+        description: Comma-separated sensor IDs. Either ids or owner is required.
+      - name: owner
+        in: query
+        type: integer
+        description: Compare every sensor owned by this user.
+      - name: metric
+        in: query
+        type: string
+        enum: [temperature, humidity, pressure, lightLevel]
+        default: temperature
+      - name: aggregate
+        in: query
+        type: string
+        enum: [avg, min, max, count]
+        default: avg
+      - name: bucket
+        in: query
+        type: string
+        default: 1h
+        description: Bucket width such as 30s, 15m, 1h or 1d.
+      - name: from
+        in: query
+        type: string
+        format: date-time
+        description: Start of the window, rounded down to a bucket boundary. Defaults to one day before to.
+      - name: to
+        in: query
+        type: string
+        format: date-time
+        description: End of the window, rounded up to a bucket boundary. Defaults to now.
+    responses:
+      200:
+        description: >
+          buckets holds the start of every bucket; each sensor's values has one
+          entry per bucket, null (0 for count) where the sensor has no readings.
+        examples:
+          application/json:
+            metric: "temperature"
+            aggregate: "avg"
+            bucketSeconds: 3600
+            source: "rollup:1h"
+            from: "2025-11-13T00:00:00"
+            to: "2025-11-13T03:00:00"
+            buckets: ["2025-11-13T00:00:00", "2025-11-13T01:00:00", "2025-11-13T02:00:00"]
+            sensors:
+              - id: 1
+                name: "Living Room Temp"
+                values: [21.4, 21.1, null]
+            notFound: [7]
+      400: {description: 'Invalid query parameters or too many sensors or buckets'}
+    """
+    metric = request.args.get("metric", "temperature")
+    aggregate = request.args.get("aggregate", "avg")
+    if metric not in METRIC_COLUMNS:
+        return jsonify({"message": f"metric must be one of: {', '.join(METRIC_COLUMNS)}."}), 400
+    if aggregate not in COMPARE_AGGREGATES:
+        return jsonify({"message": f"aggregate must be one of: {', '.join(COMPARE_AGGREGATES)}."}), 400
+    try:
+        width = _duration_arg("bucket", "1h")
+        start = _timestamp_arg("from")
+        end = _timestamp_arg("to") or utc_now()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if start is None:
+        start = end - timedelta(days=1)
+    if start >= end:
+        return jsonify({"message": "from must be before to."}), 400
+
+    ids = request.args.get("ids")
+    owner = request.args.get("owner")
+    if (ids is None) == (owner is None):
+        return jsonify({"message": "Pass either ids or owner."}), 400
+    query = db.select(Sensor.id, Sensor.name)
+    if ids is not None:
+        parts = [part.strip() for part in ids.split(",") if part.strip()]
+        if not parts or not all(part.isdigit() for part in parts):
+            return jsonify({"message": "ids must be a comma-separated list of sensor IDs."}), 400
+        requested = list(dict.fromkeys(int(part) for part in parts))
+        if len(requested) > MAX_COMPARE_SENSORS:
+            return jsonify({"message": f"At most {MAX_COMPARE_SENSORS} sensors can be compared at once."}), 400
+        query = query.where(Sensor.id.in_(requested))
+    else:
+        if not owner.isdigit():
+            return jsonify({"message": "owner must be a user ID."}), 400
+        requested = []
+        query = query.where(Sensor.user_id == int(owner))
+    sensors = db.session.execute(query.order_by(Sensor.id)).all()
+    if len(sensors) > MAX_COMPARE_SENSORS:
+        return jsonify({"message": f"At most {MAX_COMPARE_SENSORS} sensors can be compared at once."}), 400
+
+    # Snap the window to bucket boundaries so the first and last buckets are whole
+    first = int(epoch_seconds(start)) // width * width
+    last = -(-int(epoch_seconds(end)) // width) * width
+    bucket_count = (last - first) // width
+    if bucket_count > MAX_COMPARE_BUCKETS:
+        return jsonify({"message": f"The window spans more than {MAX_COMPARE_BUCKETS} buckets, use a wider bucket."}), 400
+    start = EPOCH + timedelta(seconds=first)
+    end = EPOCH + timedelta(seconds=last)
+    resolution = _compare_source(width, start)
+
+    empty = 0 if aggregate == "count" else None
+    matrix = {sensor.id: [empty] * bucket_count for sensor in sensors}
+    if matrix:
+        query = _compare_query(list(matrix), METRIC_COLUMNS[metric], aggregate, width, start, end, resolution)
+        for sensor_id, bucket, value in db.session.execute(query):
+            matrix[sensor_id][(bucket - first) // width] = value
+
+    found = set(matrix)
+    return jsonify({
+        "metric": metric,
+        "aggregate": aggregate,
+        "bucketSeconds": width,
+        "source": f"rollup:{resolution}" if resolution else "raw",
+        "from": start,
+        "to": end,
+        "buckets": [EPOCH + timedelta(seconds=first + i * width) for i in range(bucket_count)],
+        "sensors": [{"id": sensor.id, "name": sensor.name, "values": matrix[sensor.id]} for sensor in sensors],
+        "notFound": [sensor_id for sensor_id in requested if sensor_id not in found],
+    }), 200
+
+
 # --- Protected Sensor Routes ---
+def _valid_retention(value):
+    return value is None or (isinstance(value, int) and not isinstance(value, bool) and value >= 0)
+
+
 @sensor_bp.route("/create_sensor", methods=["POST"])
 @jwt_required(locations=["headers"])
 def create_sensor():
@@ -107,21 +821,28 @@ def create_sensor():
               type: string
               description: The IP address of the sensor.
               example: "192.168.1.101"
+            retentionDays:
+              type: integer
+              description: Days of raw readings to keep (null uses the global RETENTION_RAW_DAYS, 0 keeps forever).
+              example: 90
     responses:
       201: {description: 'Sensor created successfully'}
       400: {description: 'Invalid input data'}
     """
-    current_user_id = get_jwt_identity()
     name = request.json.get("name")
     ip_address = request.json.get("ipAddress")
     if not name or not ip_address:
         return jsonify({"message": "You must include a sensor name and IP address"}), 400
-    new_sensor = Sensor(name=name, ip_address=ip_address, user_id=current_user_id)
+    retention_days = request.json.get("retentionDays")
+    if not _valid_retention(retention_days):
+        return jsonify({"message": "retentionDays must be a non-negative integer or null."}), 400
+    new_sensor = Sensor(name=name, ip_address=ip_address, user_id=current_user.id, retention_days=retention_days)
     try:
         db.session.add(new_sensor)
         db.session.commit()
     except Exception as e:
         return jsonify({"message": str(e)}), 400
+    response_cache.invalidate("sensors")
     return jsonify({"message": "Sensor created!"}), 201
 
 
@@ -151,18 +872,28 @@ def update_sensor(sensor_id):
             ipAddress:
               type: string
               description: The new IP address of the sensor.
+            retentionDays:
+              type: integer
+              description: Days of raw readings to keep (null uses the global RETENTION_RAW_DAYS, 0 keeps forever).
           example:
             name: "Updated Living Room Sensor"
             ipAddress: "192.168.1.254"
+            retentionDays: 30
     responses:
       200: {description: 'Sensor updated successfully'}
+      400: {description: 'Invalid input data'}
       404: {description: 'Sensor not found'}
     """
     sensor = Sensor.query.get_or_404(sensor_id, description="Sensor not found")
     data = request.json
+    if "retentionDays" in data:
+        if not _valid_retention(data["retentionDays"]):
+            return jsonify({"message": "retentionDays must be a non-negative integer or null."}), 400
+        sensor.retention_days = data["retentionDays"]
     sensor.name = data.get("name", sensor.name)
     sensor.ip_address = data.get("ipAddress", sensor.ip_address)
     db.session.commit()
+    response_cache.invalidate("sensors", f"sensor:{sensor_id}")
     return jsonify({"message": "Sensor updated."}), 200
 
 
@@ -185,8 +916,12 @@ def delete_sensor(sensor_id):
       404: {description: 'Sensor not found'}
     """
     sensor = Sensor.query.get_or_404(sensor_id, description="Sensor not found")
+    # Readings are removed per physical table, which also works when sensor_data is a partition view
+    for table in physical_tables():
+        db.session.execute(delete(table).where(table.c.sensor_id == sensor_id))
     db.session.delete(sensor)
     db.session.commit()
+    response_cache.invalidate("sensors", f"sensor:{sensor_id}")
     return jsonify({"message": "Sensor deleted!"}), 200
 
 
@@ -195,6 +930,8 @@ def delete_sensor(sensor_id):
 @jwt_required(locations=["headers"])
 def create_sensor_data():
     """Create a new data point for a sensor
+    With INGEST_MODE=async the reading is validated, queued for a background group
+    commit and answered with 202 before it is written.
     ---
     tags:
       - Sensor Data
@@ -234,32 +971,136 @@ def create_sensor_data():
             timestamp: "2025-11-13T12:00:00Z"
     responses:
       201: {description: 'Data point created successfully'}
+      202: {description: 'Data point queued for writing (INGEST_MODE=async)'}
       400: {description: 'Invalid or missing data'}
       404: {description: 'Sensor not found'}
+      429: {description: 'Ingest queue is full, retry later'}
     """
     data = request.json
-    sensor_id = data.get("sensorId")
-    temperature = data.get("temperature")
-    humidity = data.get("humidity")
-    pressure = data.get("pressure")
-    light_level = data.get("lightLevel")
-
     if not all(k in data and data[k] is not None for k in ["sensorId", "temperature", "humidity"]):
         return jsonify({"message": "sensorId, temperature, and humidity are required."}), 400
+    try:
+        reading = parse_reading(data)
+    except ReadingError as e:
+        return jsonify({"message": str(e)}), 400
 
-    if not Sensor.query.get(sensor_id):
-        return jsonify({"message": f"Sensor with id {sensor_id} not found."}), 404
+    if not Sensor.query.get(reading["sensor_id"]):
+        return jsonify({"message": f"Sensor with id {reading['sensor_id']} not found."}), 404
 
-    new_data_point = SensorData(
-        sensor_id=sensor_id,
-        temperature=temperature,
-        humidity=humidity,
-        pressure=pressure,
-        light_level=light_level
-    )
-    db.session.add(new_data_point)
+    if ingest_queue.enabled:
+        if not ingest_queue.submit(reading):
+            response = jsonify({"message": "Ingest queue is full, retry later."})
+            response.headers["Retry-After"] = "1"
+            return response, 429
+        return jsonify({
+            "message": "Data point queued.",
+            "sensorId": reading["sensor_id"],
+            "timestamp": reading["timestamp"],
+        }), 202
+
+    insert_readings([reading])
     db.session.commit()
-    return jsonify(new_data_point.to_json()), 201
+    readings_committed([reading])
+    return jsonify(data_point_json(reading)), 201
+
+
+@sensor_bp.route("/sensor_data/batch", methods=["POST"])
+@jwt_required(locations=["headers"])
+def create_sensor_data_batch():
+    """Create many data points, for any number of sensors, in one request
+    Sensor IDs are validated with a single lookup and all valid readings are
+    written with one bulk insert. Invalid readings are rejected individually.
+    ---
+    tags:
+      - Sensor Data
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [readings]
+          properties:
+            readings:
+              type: array
+              items:
+                type: object
+                required: [sensorId, temperature, humidity]
+                properties:
+                  sensorId: {type: integer}
+                  temperature: {type: number, format: float}
+                  humidity: {type: number, format: float}
+                  pressure: {type: number, format: float}
+                  lightLevel: {type: number, format: float}
+                  timestamp: {type: string, format: date-time}
+          example:
+            readings:
+              - sensorId: 1
+                temperature: 21.5
+                humidity: 48.9
+                timestamp: "2025-11-13T12:00:00Z"
+              - sensorId: 2
+                temperature: 19.2
+                humidity: 51.0
+                pressure: 1011.7
+    responses:
+      201:
+        description: At least one reading was accepted
+        examples:
+          application/json:
+            accepted: 1
+            rejected: 1
+            results:
+              - {index: 0, status: accepted}
+              - {index: 1, status: rejected, message: "Sensor with id 2 not found."}
+      400: {description: 'Malformed body, or every reading was rejected'}
+      413: {description: 'Too many readings in one batch'}
+    """
+    data = request.get_json(silent=True)
+    readings = data.get("readings") if isinstance(data, dict) else data
+    if not isinstance(readings, list) or not readings:
+        return jsonify({"message": "readings must be a non-empty array."}), 400
+    max_batch = current_app.config["SENSOR_DATA_MAX_BATCH"]
+    if len(readings) > max_batch:
+        return jsonify({"message": f"A batch may contain at most {max_batch} readings."}), 413
+
+    results = ingest_batch(readings)
+    accepted = sum(1 for result in results if result["status"] == "accepted")
+    body = {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
+    return jsonify(body), 201 if accepted else 400
+
+
+@sensor_bp.route("/sensor_data/ingest_stats", methods=["GET"])
+@jwt_required(locations=["headers"])
+def ingest_stats():
+    """Ingest queue metrics
+    Queue depth and capacity, counts of queued, refused, written and failed
+    readings, and group commit latency percentiles over the last 1000 batches.
+    ---
+    tags:
+      - Sensor Data
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Current ingest queue metrics
+        examples:
+          application/json:
+            mode: async
+            queueDepth: 12
+            queueCapacity: 10000
+            batchSize: 500
+            flushIntervalMs: 50
+            enqueued: 48210
+            rejected: 0
+            committed: 48198
+            failed: 0
+            batches: 1630
+            commitLatencyMs: {p50: 3.1, p95: 9.8, max: 41.2}
+    """
+    return jsonify(ingest_queue.stats()), 200
 
 
 @sensor_bp.route("/sensor_data/<int:data_id>", methods=["GET"])
@@ -336,15 +1177,29 @@ def update_sensor_data(data_id):
             humidity: 47.5
     responses:
       200: {description: 'Data point updated successfully'}
+      400: {description: 'A supplied value is not a number, or temperature/humidity is null'}
       404: {description: 'Data point not found'}
     """
     data_point = SensorData.query.get_or_404(data_id, description="Data point not found")
     data = request.json
-    data_point.temperature = data.get("temperature", data_point.temperature)
-    data_point.humidity = data.get("humidity", data_point.humidity)
-    data_point.pressure = data.get("pressure", data_point.pressure)
-    data_point.light_level = data.get("lightLevel", data_point.light_level)
+    if not isinstance(data, dict):
+        return jsonify({"message": "The request body must be an object."}), 400
+    sensor_id, timestamp = data_point.sensor_id, data_point.timestamp
+    old = {column: getattr(data_point, column) for column in ROLLUP_METRIC_COLUMNS}
+    new = dict(old)
+    try:
+        for key, column in METRIC_COLUMNS.items():
+            if key in data:
+                new[column] = _parse_number(data, key, required=key in ("temperature", "humidity"))
+    except ReadingError as e:
+        return jsonify({"message": str(e)}), 400
+    table = table_for_timestamp(timestamp)
+    db.session.execute(update(table).where(table.c.id == data_id).values(**new))
+    db.session.expire(data_point)
+    adjust_rollups(sensor_id, timestamp, old, new)
+    refresh_latest([sensor_id])
     db.session.commit()
+    response_cache.invalidate("sensor_data", f"sensor:{sensor_id}")
     return jsonify({"message": "Data point updated."}), 200
 
 
@@ -367,6 +1222,13 @@ def delete_sensor_data(data_id):
       404: {description: 'Data point not found'}
     """
     data_point = SensorData.query.get_or_404(data_id, description="Data point not found")
-    db.session.delete(data_point)
+    sensor_id, timestamp = data_point.sensor_id, data_point.timestamp
+    old = {column: getattr(data_point, column) for column in ROLLUP_METRIC_COLUMNS}
+    table = table_for_timestamp(timestamp)
+    db.session.execute(delete(table).where(table.c.id == data_id))
+    db.session.expunge(data_point)
+    adjust_rollups(sensor_id, timestamp, old)
+    refresh_latest([sensor_id])
     db.session.commit()
+    response_cache.invalidate("sensor_data", f"sensor:{sensor_id}")
     return jsonify({"message": "Data point deleted."}), 200
\ No newline at end of file
@@ -0,0 +1,88 @@
+import queue
+from flask import Blueprint, Response, current_app, stream_with_context
+from config import broadcaster
+from models import Sensor
+from utils.serialization import data_point_json
+from utils.stream_feed import stream_feed
+
+stream_bp = Blueprint('stream_bp', __name__)
+
+
+def _event_stream(subscription, heartbeat, json):
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                row = subscription.get(timeout=heartbeat)
+            except queue.Empty:
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+                continue
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield "event: resync\ndata: {}\n\n"
+            yield f"id: {row['id']}\nevent: reading\ndata: {json.dumps(data_point_json(row))}\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+def _stream_response(sensor_id):
+    subscription = broadcaster.subscribe(sensor_id)
+    stream_feed.ensure_started()
+    stream_feed.wake()
+    heartbeat = current_app.config["STREAM_HEARTBEAT_SECONDS"]
+    return Response(
+        stream_with_context(_event_stream(subscription, heartbeat, current_app.json)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@stream_bp.route("/stream/sensor_data", methods=["GET"])
+def stream_all_sensor_data():
+    """Live stream of new data points for all sensors
+    This is a public endpoint. Server-sent events: each new data point is sent
+    once, as a `reading` event, after it has been committed, whichever process
+    wrote it (within STREAM_POLL_MS for writes from other processes). A `resync` event
+    means this client fell behind and some readings were dropped, so it should
+    re-fetch the sensor details.
+    ---
+    tags:
+      - Streaming
+    produces:
+      - text/event-stream
+    responses:
+      200:
+        description: An event stream of `reading` events.
+        examples:
+          text/event-stream: |
+            id: 102
+            event: reading
+            data: {"id": 102, "sensorId": 1, "temperature": 21.5, "humidity": 48.9, "pressure": null, "lightLevel": null, "timestamp": "2025-11-13T12:00:00"}
+    """
+    return _stream_response(None)
+
+
+@stream_bp.route("/stream/sensor_data/<int:sensor_id>", methods=["GET"])
+def stream_sensor_data(sensor_id):
+    """Live stream of new data points for one sensor
+    This is a public endpoint. Same events as /stream/sensor_data, filtered to one sensor.
+    ---
+    tags:
+      - Streaming
+    produces:
+      - text/event-stream
+    parameters:
+      - name: sensor_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200: {description: 'An event stream of `reading` events.'}
+      404: {description: 'Sensor not found'}
+    """
+    Sensor.query.get_or_404(sensor_id, description="Sensor not found")
+    return _stream_response(sensor_id)
@@ -0,0 +1,147 @@
+import numpy as np
+
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+ANOMALY_METHODS = ("zscore", "ewma")
+# Rows per step of the blocked EWMA; (1 - alpha) ** -EWMA_BLOCK stays finite for alpha <= 2/3
+EWMA_BLOCK = 256
+
+
+def epoch_array(timestamps):
+    """
+    Seconds since the Unix epoch as float64 for a sequence of naive UTC datetimes.
+    """
+    return np.array(timestamps, dtype="datetime64[us]").astype(np.int64) / 1e6
+
+
+def _number(value):
+    return None if value is None or not np.isfinite(value) else float(value)
+
+
+def summary_statistics(values):
+    """
+    count, mean, sample standard deviation, min, max and percentiles of a float array.
+    """
+    count = len(values)
+    if not count:
+        return {"count": 0, "mean": None, "stddev": None, "min": None, "max": None,
+                "percentiles": {f"p{p}": None for p in PERCENTILES}}
+    percentiles = np.percentile(values, PERCENTILES)
+    return {
+        "count": count,
+        "mean": float(values.mean()),
+        "stddev": float(values.std(ddof=1)) if count > 1 else None,
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {f"p{p}": float(value) for p, value in zip(PERCENTILES, percentiles)},
+    }
+
+
+def rate_of_change(times, values):
+    """
+    Change per second between consecutive readings, NaN where two readings share
+    a timestamp. The first element is NaN as well, so the result aligns with values.
+    """
+    rates = np.full(len(values), np.nan)
+    if len(values) > 1:
+        elapsed = np.diff(times)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates[1:] = np.where(elapsed > 0, np.diff(values) / elapsed, np.nan)
+    return rates
+
+
+def rate_statistics(rates):
+    finite = rates[np.isfinite(rates)]
+    if not len(finite):
+        return {"meanPerSecond": None, "minPerSecond": None, "maxPerSecond": None, "meanAbsPerSecond": None}
+    return {
+        "meanPerSecond": float(finite.mean()),
+        "minPerSecond": float(finite.min()),
+        "maxPerSecond": float(finite.max()),
+        "meanAbsPerSecond": float(np.abs(finite).mean()),
+    }
+
+
+def ewma(values, alpha, initial):
+    """
+    y[i] = (1 - alpha) * y[i - 1] + alpha * values[i], with y[-1] = initial.
+    The recursion is solved in closed form a block of rows at a time, so the
+    Python loop runs len(values) / EWMA_BLOCK times.
+    """
+    decay = 1.0 - alpha
+    result = np.empty(len(values))
+    previous = initial
+    for start in range(0, len(values), EWMA_BLOCK):
+        block = values[start:start + EWMA_BLOCK]
+        powers = decay ** np.arange(len(block))
+        # y[k] = decay^(k+1) * previous + alpha * decay^k * sum_{j<=k} values[j] / decay^j
+        smoothed = decay * powers * previous + alpha * powers * np.cumsum(block / powers)
+        result[start:start + len(block)] = smoothed
+        previous = smoothed[-1]
+    return result
+
+
+def zscore_scores(values):
+    """
+    Distance of every value from the window mean in standard deviations.
+    """
+    if len(values) < 2:
+        return np.full(len(values), np.nan)
+    deviation = values.std(ddof=1)
+    if deviation == 0:
+        return np.zeros(len(values))
+    return np.abs(values - values.mean()) / deviation
+
+
+def ewma_scores(values, span):
+    """
+    Distance of every value from the exponentially weighted mean of the values
+    before it, in exponentially weighted standard deviations. Unlike the z-score
+    this follows level shifts and daily cycles, so it flags sudden jumps rather
+    than values that are merely far from the window average. The first `span`
+    values only warm the estimate up and score NaN.
+    """
+    scores = np.full(len(values), np.nan)
+    if len(values) < 2:
+        return scores
+    alpha = 2.0 / (span + 1)
+    mean = ewma(values, alpha, values[0])
+    # Mean and variance before each value is seen
+    prior_mean = np.concatenate(([values[0]], mean[:-1]))
+    residual = values - prior_mean
+    variance = ewma((1.0 - alpha) * residual ** 2, alpha, 0.0)
+    prior_deviation = np.sqrt(np.concatenate(([0.0], variance[:-1])))
+    # A jump after a flat stretch scores very high instead of infinite
+    floor = 1e-9 * max(1.0, float(np.abs(values).max()))
+    scores = np.abs(residual) / np.maximum(prior_deviation, floor)
+    scores[:span] = np.nan
+    return scores
+
+
+def analyze(timestamps, values, method="ewma", threshold=3.0, span=20):
+    """
+    Statistics of one metric over a window of readings sorted by time.
+    Returns (summary dict, rates, scores, anomaly mask); the arrays align with values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    times = epoch_array(timestamps)
+    rates = rate_of_change(times, values)
+    scores = zscore_scores(values) if method == "zscore" else ewma_scores(values, span)
+    with np.errstate(invalid="ignore"):
+        anomalies = scores > threshold
+    summary = summary_statistics(values)
+    summary["rateOfChange"] = rate_statistics(rates)
+    summary["anomalyCount"] = int(anomalies.sum())
+    return summary, rates, scores, anomalies
+
+
+def series_json(timestamps, values, rates, scores, anomalies):
+    """
+    Per-reading results as one array per field, like data_points_columnar().
+    """
+    return {
+        "timestamps": list(timestamps),
+        "values": list(values),
+        "ratePerSecond": [_number(rate) for rate in rates.tolist()],
+        "score": [_number(score) for score in scores.tolist()],
+        "anomaly": anomalies.tolist(),
+    }
@@ -0,0 +1,71 @@
+import queue
+import threading
+
+
+class Subscription:
+    """
+    One listener's view of the broadcast: a bounded queue of reading rows,
+    optionally filtered to a single sensor. If the listener falls behind and
+    its queue fills up, further rows are dropped and `overflowed` is set so the
+    stream can tell the client to re-fetch.
+    """
+
+    def __init__(self, sensor_id, max_queue):
+        self.sensor_id = sensor_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def offer(self, row):
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+class Broadcaster:
+    """
+    Fans committed reading rows out to every subscriber in this process.
+    Publishing never blocks on slow subscribers. Rows are published by
+    utils.stream_feed, which reads them back from the database.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, sensor_id=None):
+        subscription = Subscription(sensor_id, self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+    def resync(self):
+        """
+        Tells every subscriber it missed readings and should re-fetch.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.overflowed = True
+
+    def publish(self, rows):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        if not subscriptions:
+            return
+        for row in rows:
+            for subscription in subscriptions:
+                if subscription.sensor_id is None or subscription.sensor_id == row["sensor_id"]:
+                    subscription.offer(row)
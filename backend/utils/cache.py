@@ -0,0 +1,199 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, request
+
+
+class MemoryCacheBackend:
+    """
+    In-process cache with per-entry TTL and least-recently-used eviction.
+    Tag versions are kept apart from entries so eviction never resets them.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump_version(self, tag):
+        with self._lock:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class RedisCacheBackend:
+    """
+    Cache shared between processes through Redis, so invalidations made by one
+    worker (or by the data generator) are seen by all of them.
+    Entry eviction is left to Redis' maxmemory policy.
+    """
+
+    def __init__(self, url, prefix="sensor-api:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), px=int(ttl * 1000))
+
+    def get_versions(self, tags):
+        if not tags:
+            return []
+        values = self.client.mget([f"{self.prefix}version:{tag}" for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump_version(self, tag):
+        self.client.incr(f"{self.prefix}version:{tag}")
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """
+    Caches successful GET responses of decorated views and answers conditional
+    requests with 304 Not Modified.
+
+    Each cached view declares tags (e.g. "sensors", "sensor:3"). Every tag has a
+    version number that is part of the cache key, so invalidating a tag is a single
+    increment and stale entries simply stop being addressed until they expire.
+
+    Configuration:
+      CACHE_BACKEND       memory (default), redis or none
+      CACHE_TTL           seconds an entry lives (default 300)
+      CACHE_MAX_ENTRIES   LRU capacity of the memory backend (default 1024)
+      CACHE_REDIS_URL     connection URL for the redis backend
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 300
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get("CACHE_BACKEND", "memory")
+        self.ttl = app.config.get("CACHE_TTL", 300)
+        if kind == "memory":
+            self.backend = MemoryCacheBackend(app.config.get("CACHE_MAX_ENTRIES", 1024))
+        elif kind == "redis":
+            self.backend = RedisCacheBackend(app.config.get("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+        elif kind == "none":
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+
+    def process_local_warning(self):
+        """
+        Message for tools that change data outside the web server: with the memory
+        backend their invalidations only reach their own process, so the server keeps
+        serving cached responses for up to CACHE_TTL. None for redis and none.
+        """
+        if not isinstance(self.backend, MemoryCacheBackend):
+            return None
+        return (f"CACHE_BACKEND=memory is per process: a running web server keeps serving cached responses "
+                f"for up to {self.ttl} s after changes made here. Use CACHE_BACKEND=redis or none in both.")
+
+    def invalidate(self, *tags):
+        """
+        Makes every cached response carrying any of the given tags unreachable.
+        Call after the transaction that changed the data has committed.
+        """
+        if self.backend is None:
+            return
+        for tag in tags:
+            self.backend.bump_version(tag)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def _key(self, tags):
+        versions = self.backend.get_versions(tags)
+        tag_part = ",".join(f"{tag}@{version}" for tag, version in zip(tags, versions))
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+        return f"{request.path}?{query}|{tag_part}"
+
+    @staticmethod
+    def _conditional(body, status, headers):
+        etag = headers["ETag"].strip('"')
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": headers["ETag"], "Cache-Control": "no-cache"})
+        return Response(body, status=status, headers=headers)
+
+    def cached(self, tags):
+        """
+        Decorator for GET views. `tags` is a callable receiving the view's keyword
+        arguments and returning the list of tags the response depends on.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = None
+                if self.backend is not None:
+                    key = self._key(tags(**kwargs))
+                    hit = self.backend.get(key)
+                    if hit is not None:
+                        return self._conditional(*hit)
+
+                response = view(*args, **kwargs)
+                if isinstance(response, tuple):
+                    response, status = response[0], response[1]
+                    response.status_code = status
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+
+                body = response.get_data()
+                headers = {
+                    "Content-Type": response.content_type,
+                    "ETag": f'"{hashlib.sha1(body).hexdigest()}"',
+                    "Cache-Control": "no-cache",
+                }
+                if key is not None:
+                    self.backend.set(key, (body, 200, headers), self.ttl)
+                return self._conditional(body, 200, headers)
+            return wrapper
+        return decorator
@@ -1,7 +1,11 @@
 import random
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from config import app, db
-from models import User, Sensor, SensorData
+from models import User, Sensor
+from utils.ingest import insert_readings
+from utils.migrations import run_migrations
+from utils.partitions import drop_storage_layout
+from utils.timeseries import utc_now
 
 
 def seed_database():
@@ -40,19 +44,18 @@ def seed_database():
 
         for sensor in all_sensors:
             for i in range(10):
-                timestamp = datetime.now(timezone.utc) - timedelta(hours=i)
-                data_point = SensorData(
+                data_points_to_create.append(dict(
                     temperature=round(random.uniform(15.0, 30.0), 2),  # Celsius
                     humidity=round(random.uniform(30.0, 60.0), 2),     # %
                     pressure=round(random.uniform(980.0, 1050.0), 2),  # hPa
                     light_level=round(random.uniform(100, 1000), 2),   # lux
-                    timestamp=timestamp,
+                    timestamp=utc_now() - timedelta(hours=i),
                     sensor_id=sensor.id
-                )
-                data_points_to_create.append(data_point)
+                ))
                 total_data_points += 1
 
-        db.session.add_all(data_points_to_create)
+        # Routed through the ingest path so partitions, rollups and the latest snapshot are filled too
+        insert_readings(data_points_to_create)
         db.session.commit()
         print(f"Added {total_data_points} data points for {len(all_sensors)} sensors.")
 
@@ -62,8 +65,10 @@ def seed_database():
 def clear_and_seed_database():
     with app.app_context():
         print("Clearing the database...")
+        drop_storage_layout()
         db.drop_all()
         db.create_all()
+        run_migrations()
         print("Database cleared and tables recreated.")
         seed_database()
 
@@ -0,0 +1,72 @@
+def lttb(rows, threshold, x, y):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Picks `threshold` of the given rows (sorted by x) that best preserve the
+    visual shape of the y series. `x` and `y` are callables returning numbers
+    for a row; y may return None for missing values, which count as 0.
+    """
+    count = len(rows)
+    if threshold >= count or threshold < 3:
+        return list(rows)
+
+    xs = [x(row) for row in rows]
+    ys = [y(row) or 0.0 for row in rows]
+    sampled = [rows[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        point_ax = xs[a]
+        point_ay = ys[a]
+        max_area = -1.0
+        chosen = start
+        for j in range(start, end):
+            area = abs((point_ax - avg_x) * (ys[j] - point_ay) - (point_ax - xs[j]) * (avg_y - point_ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        sampled.append(rows[chosen])
+        a = chosen
+    sampled.append(rows[-1])
+    return sampled
+
+
+def min_max_buckets(rows, threshold, start, end, x, y):
+    """
+    Splits [start, end] into threshold // 2 equal-width buckets and keeps the
+    rows holding the minimum and maximum y value in each bucket.
+    Works on any iterable of rows sorted by x, so it can consume a streamed result.
+    """
+    bucket_count = max(threshold // 2, 1)
+    width = (end - start) / bucket_count or 1
+    buckets = {}
+    for row in rows:
+        value = y(row)
+        if value is None:
+            continue
+        bucket = min(int((x(row) - start) / width), bucket_count - 1)
+        entry = buckets.get(bucket)
+        if entry is None:
+            buckets[bucket] = [row, value, row, value]
+        elif value < entry[1]:
+            entry[0], entry[1] = row, value
+        elif value > entry[3]:
+            entry[2], entry[3] = row, value
+
+    sampled = []
+    for bucket in sorted(buckets):
+        low, _, high, _ = buckets[bucket]
+        if low is high:
+            sampled.append(low)
+        elif x(low) <= x(high):
+            sampled.extend((low, high))
+        else:
+            sampled.extend((high, low))
+    return sampled
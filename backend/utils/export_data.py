@@ -0,0 +1,154 @@
+import argparse
+import csv
+import io
+import sys
+from config import app, db
+from utils.partitions import sensor_data_entity
+from utils.serialization import DATA_POINT_COLUMNS
+from utils.timeseries import parse_timestamp
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_FIELDS = ("id", "sensor_id", "timestamp", "temperature", "humidity", "pressure", "light_level")
+EXPORT_CHUNK_SIZE = 5000
+
+
+def _export_query(sensor_ids, start, end):
+    Data = sensor_data_entity(start, end)
+    query = db.select(*[getattr(Data, column.key) for column in DATA_POINT_COLUMNS])
+    if sensor_ids:
+        query = query.where(Data.sensor_id.in_(sensor_ids))
+    if start is not None:
+        query = query.where(Data.timestamp >= start)
+    if end is not None:
+        query = query.where(Data.timestamp < end)
+    return query.order_by(Data.sensor_id, Data.timestamp, Data.id)
+
+
+def _chunks(sensor_ids, start, end, chunk_size):
+    """
+    Yields lists of row mappings. The result is streamed from the database cursor,
+    so at most one chunk is held in memory at a time.
+    """
+    query = _export_query(sensor_ids, start, end).execution_options(yield_per=chunk_size)
+    for partition in db.session.execute(query).mappings().partitions():
+        yield partition
+
+
+def _csv_stream(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in chunks:
+        writer.writerows(
+            [row[field].isoformat() if field == "timestamp" else row[field] for field in EXPORT_FIELDS]
+            for row in chunk
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _ndjson_stream(chunks, dumps):
+    for chunk in chunks:
+        yield "".join(dumps({field: row[field] for field in EXPORT_FIELDS}) + "\n" for row in chunk).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands back whatever was written since the last drain,
+    letting ParquetWriter output be streamed one row group at a time.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_stream(chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package") from e
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("sensor_id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("temperature", pa.float64()),
+        ("humidity", pa.float64()),
+        ("pressure", pa.float64()),
+        ("light_level", pa.float64()),
+    ])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            columns = {field: [row[field] for row in chunk] for field in EXPORT_FIELDS}
+            writer.write_table(pa.table(columns, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_export(fmt, sensor_ids=None, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Generator of encoded export bytes for the given sensors and [start, end) range,
+    ordered by sensor and time. Must be consumed inside an application context.
+    """
+    chunks = _chunks(sensor_ids, start, end, chunk_size)
+    if fmt == "csv":
+        return _csv_stream(chunks)
+    if fmt == "ndjson":
+        return _ndjson_stream(chunks, app.json.dumps)
+    if fmt == "parquet":
+        return _parquet_stream(chunks)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export sensor history as CSV, NDJSON or Parquet.")
+    parser.add_argument("--sensor", type=int, action="append", dest="sensor_ids", help="Sensor ID (repeatable). Defaults to all sensors.")
+    parser.add_argument("--from", dest="start", type=parse_timestamp, help="Only export readings at or after this time.")
+    parser.add_argument("--to", dest="end", type=parse_timestamp, help="Only export readings before this time.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", help="Output file. Defaults to standard output.")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with app.app_context():
+        output = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for data in stream_export(args.format, args.sensor_ids, args.start, args.end, args.chunk_size):
+                output.write(data)
+        finally:
+            if args.output:
+                output.close()
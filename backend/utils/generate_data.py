@@ -1,38 +1,56 @@
 import random
 from datetime import datetime
-from main import app, db
-from models import Sensor, SensorData
+from config import app, db, response_cache
+from models import Sensor
+from utils.ingest import insert_readings, readings_committed
+from utils.timeseries import utc_now
+
+
+def generate_readings():
+    """
+    Inserts one random reading for every sensor, timestamped now, and returns
+    how many were written. Needs an app context; only sensor ids are loaded.
+    The scheduler (utils.scheduler) runs this as the generate_data job.
+    """
+    sensor_ids = db.session.scalars(db.select(Sensor.id)).all()
+    if not sensor_ids:
+        return 0
+    timestamp = utc_now()
+    new_data_points = [
+        dict(
+            sensor_id=sensor_id,
+            temperature=round(random.uniform(15.0, 30.0), 2),
+            humidity=round(random.uniform(30.0, 60.0), 2),
+            pressure=round(random.uniform(980.0, 1050.0), 2),
+            light_level=round(random.uniform(100, 1000), 2),
+            timestamp=timestamp,
+        )
+        for sensor_id in sensor_ids
+    ]
+    insert_readings(new_data_points)
+    db.session.commit()
+    readings_committed(new_data_points)
+    return len(new_data_points)
 
 
 def generate_new_data_points():
     """
     Generates 1 new data point for each existing sensor in the database.
-    This function is designed to be run on a schedule (e.g., a cron job).
+    For a one-off run; to generate data periodically use the scheduler
+    (GENERATE_DATA_INTERVAL_SECONDS) instead of cron.
     """
+    stale_cache = response_cache.process_local_warning()
+    if stale_cache:
+        print(f"Warning: {stale_cache}")
     with app.app_context():
         print(f"[{datetime.now()}] Starting data generation task...")
-        sensors = Sensor.query.all()
-        if not sensors:
+        created = generate_readings()
+        if not created:
             print("No sensors found in the database. Exiting.")
             return
-        print(f"Found {len(sensors)} sensors. Generating new data points...")
-
-        new_data_points = []
-        for sensor in sensors:
-            new_data = SensorData(
-                sensor_id=sensor.id,
-                temperature=round(random.uniform(15.0, 30.0), 2),
-                humidity=round(random.uniform(30.0, 60.0), 2),
-                pressure=round(random.uniform(980.0, 1050.0), 2),
-                light_level=round(random.uniform(100, 1000), 2),
-            )
-            new_data_points.append(new_data)
-        db.session.add_all(new_data_points)
-        db.session.commit()
-
-        print(f"Successfully created {len(new_data_points)} new data points.")
+        print(f"Successfully created {created} new data points.")
         print(f"[{datetime.now()}] Data generation task finished.")
 
 
 if __name__ == "__main__":
-    generate_new_data_points()
\ No newline at end of file
+    generate_new_data_points()
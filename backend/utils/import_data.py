@@ -0,0 +1,202 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from config import app, db, response_cache
+from utils.ingest import ReadingError, existing_sensor_ids, insert_readings, parse_reading, readings_committed
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_CHUNK_SIZE = 20000
+MAX_REPORTED_ERRORS = 100
+
+# Accept both the export column names and the API field names
+FIELD_ALIASES = {
+    "sensor_id": "sensorId",
+    "light_level": "lightLevel",
+}
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+class ImportFailed(Exception):
+    """
+    Raised when an import stops part-way. `offset` is the number of records that
+    were committed, to be passed back as the resume offset.
+    """
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def _normalize(record):
+    normalized = {}
+    for key, value in record.items():
+        if value == "":
+            value = None
+        normalized[FIELD_ALIASES.get(key, key)] = value
+    return normalized
+
+
+def iter_records(stream, fmt):
+    """
+    Lazily parses a binary stream of CSV or NDJSON into reading dicts in API form.
+    Unparseable NDJSON lines are yielded as None so they can be counted as rejected.
+    """
+    if fmt == "csv":
+        text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        for record in csv.DictReader(text):
+            yield _normalize(record)
+    elif fmt == "ndjson":
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = _loads(line)
+            except ValueError:
+                yield None
+                continue
+            yield _normalize(record) if isinstance(record, dict) else None
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+
+class ImportProgress:
+    """
+    Running totals of an import. Passed to the progress callback after every chunk.
+    """
+
+    def __init__(self, offset):
+        self.started_at = time.perf_counter()
+        self.start_offset = offset
+        self.offset = offset
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started_at
+        return (self.offset - self.start_offset) / elapsed if elapsed else 0.0
+
+    def reject(self, position, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"record": position, "message": message})
+
+    def to_json(self):
+        return {
+            "offset": self.offset,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "rowsPerSecond": round(self.rows_per_second),
+            "errors": self.errors,
+        }
+
+
+def _import_chunk(chunk, progress, known_ids, unknown_ids):
+    parsed = []
+    for position, record in chunk:
+        if record is None:
+            progress.reject(position, "Record is not a JSON object.")
+            continue
+        try:
+            parsed.append((position, parse_reading(record)))
+        except ReadingError as e:
+            progress.reject(position, str(e))
+
+    unseen = {row["sensor_id"] for _, row in parsed} - known_ids - unknown_ids
+    if unseen:
+        found = existing_sensor_ids(unseen)
+        known_ids |= found
+        unknown_ids |= unseen - found
+
+    rows = []
+    for position, row in parsed:
+        if row["sensor_id"] in known_ids:
+            rows.append(row)
+        else:
+            progress.reject(position, f"Sensor with id {row['sensor_id']} not found.")
+
+    insert_readings(rows, returning=False)
+    db.session.commit()
+    readings_committed(rows, publish=False)
+    progress.inserted += len(rows)
+    progress.offset += len(chunk)
+
+
+def import_records(records, resume_from=0, chunk_size=IMPORT_CHUNK_SIZE, on_progress=None):
+    """
+    Validates and bulk inserts readings from an iterable, committing once per chunk.
+    The first `resume_from` records are skipped, which together with the offset
+    carried by ImportFailed lets an interrupted import continue where it stopped.
+    Returns the final ImportProgress.
+    """
+    progress = ImportProgress(resume_from)
+    known_ids, unknown_ids = set(), set()
+    chunk = []
+    try:
+        for position, record in enumerate(records):
+            if position < resume_from:
+                continue
+            if position == resume_from:
+                # Measure throughput from the first imported record, not from the skip
+                progress.started_at = time.perf_counter()
+            chunk.append((position, record))
+            if len(chunk) >= chunk_size:
+                _import_chunk(chunk, progress, known_ids, unknown_ids)
+                chunk = []
+                if on_progress:
+                    on_progress(progress)
+        if chunk:
+            _import_chunk(chunk, progress, known_ids, unknown_ids)
+            if on_progress:
+                on_progress(progress)
+    except Exception as e:
+        db.session.rollback()
+        raise ImportFailed(f"Import stopped at record {progress.offset}: {e}", progress.offset) from e
+    return progress
+
+
+def _print_progress(progress):
+    print(
+        f"{progress.offset} records processed, {progress.inserted} inserted, "
+        f"{progress.rejected} rejected ({progress.rows_per_second:,.0f} rows/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import historical readings from CSV or NDJSON.")
+    parser.add_argument("path", help="File to import, or - for standard input.")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+    parser.add_argument("--resume-from", type=int, default=0, help="Number of records already imported.")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    if fmt not in IMPORT_FORMATS:
+        parser.error("cannot infer the format from the file name, pass --format")
+    stale_cache = response_cache.process_local_warning()
+    if stale_cache:
+        print(f"Warning: {stale_cache}", file=sys.stderr)
+
+    with app.app_context():
+        stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+        try:
+            result = import_records(iter_records(stream, fmt), args.resume_from, args.chunk_size, _print_progress)
+        except ImportFailed as e:
+            print(f"{e}\nRe-run with --resume-from {e.offset} to continue.", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            stream.close()
+        for error in result.errors:
+            print(f"record {error['record']}: {error['message']}", file=sys.stderr)
+        print(f"Import complete: {result.inserted} inserted, {result.rejected} rejected.", file=sys.stderr)
@@ -0,0 +1,203 @@
+import math
+from sqlalchemy import func, insert
+from config import app, db, response_cache
+from models import Sensor, SensorData
+from utils.ingest_queue import IngestQueue
+from utils.latest import refresh_latest, update_latest
+from utils.partitions import route_rows
+from utils.rollups import merge_rollups_from_raw, update_rollups
+from utils.stream_feed import stream_feed
+from utils.timeseries import parse_timestamp, utc_now
+
+
+SQLITE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class ReadingError(ValueError):
+    """
+    Raised when a submitted reading fails validation.
+    """
+
+
+def _parse_number(data, key, required):
+    value = data.get(key)
+    if value is None:
+        if required:
+            raise ReadingError(f"{key} is required.")
+        return None
+    if isinstance(value, bool):
+        raise ReadingError(f"{key} must be a number.")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ReadingError(f"{key} must be a number.")
+    if not math.isfinite(value):
+        raise ReadingError(f"{key} must be a finite number.")
+    return value
+
+
+def parse_reading(data):
+    """
+    Validates a reading in its API form (camelCase keys) and returns a row dict
+    ready for insertion into sensor_data. Does not check that the sensor exists.
+    """
+    if not isinstance(data, dict):
+        raise ReadingError("Each reading must be an object.")
+    sensor_id = data.get("sensorId")
+    if sensor_id is None:
+        raise ReadingError("sensorId is required.")
+    if isinstance(sensor_id, str) and sensor_id.isdigit():
+        sensor_id = int(sensor_id)
+    if isinstance(sensor_id, bool) or not isinstance(sensor_id, int):
+        raise ReadingError("sensorId must be an integer.")
+
+    timestamp = data.get("timestamp")
+    if timestamp is None:
+        timestamp = utc_now()
+    else:
+        try:
+            timestamp = parse_timestamp(timestamp)
+        except ValueError:
+            raise ReadingError("timestamp must be an ISO-8601 date-time.")
+
+    return {
+        "sensor_id": sensor_id,
+        "temperature": _parse_number(data, "temperature", required=True),
+        "humidity": _parse_number(data, "humidity", required=True),
+        "pressure": _parse_number(data, "pressure", required=False),
+        "light_level": _parse_number(data, "lightLevel", required=False),
+        "timestamp": timestamp,
+    }
+
+
+def existing_sensor_ids(sensor_ids):
+    """
+    Returns the subset of sensor_ids that exist, using a single IN query.
+    """
+    sensor_ids = set(sensor_ids)
+    if not sensor_ids:
+        return set()
+    rows = db.session.execute(db.select(Sensor.id).where(Sensor.id.in_(sensor_ids)))
+    return {row[0] for row in rows}
+
+
+def insert_sqlite_values(values):
+    """
+    Bulk load path for SQLite: hands (sensor_id, timestamp text, temperature,
+    humidity, pressure, light_level) tuples straight to the driver's executemany,
+    skipping SQLAlchemy's per-parameter processing, then builds the rollups from
+    the new rows inside the database. Timestamps must already be formatted with
+    SQLITE_TIMESTAMP_FORMAT. The new rows are identified after the INSERT: from
+    then on this transaction holds SQLite's write lock, so nobody else can have
+    added rows, and the rows it just inserted got consecutive ids ending at the
+    table's (or partition's) maximum. The caller owns the transaction and must commit.
+    """
+    for table, group in route_rows(values, lambda value: value[1]).items():
+        cursor = db.session.connection().exec_driver_sql(
+            f"INSERT INTO {table.name} (sensor_id, timestamp, temperature, humidity, pressure, light_level) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            group,
+        )
+        last_id = db.session.scalar(db.select(func.max(table.c.id)))
+        inserted = [SensorData.id > last_id - cursor.rowcount, SensorData.id <= last_id]
+        merge_rollups_from_raw(*inserted)
+        refresh_latest(db.select(SensorData.sensor_id).where(*inserted).distinct())
+
+
+def insert_readings(rows, returning=True):
+    """
+    Inserts already-validated reading rows with one bulk insert and merges them
+    into the rollup tables and the latest-reading snapshot. With returning=True the generated primary key is
+    stored back into each row as "id"; without it the rows are written through
+    the fastest path the database offers, for bulk loads that do not need ids.
+    The caller owns the transaction and must commit.
+    """
+    if not rows:
+        return
+    if not returning and db.session.get_bind().dialect.name == "sqlite":
+        insert_sqlite_values([
+            (
+                row["sensor_id"],
+                row["timestamp"].strftime(SQLITE_TIMESTAMP_FORMAT),
+                row["temperature"],
+                row["humidity"],
+                row["pressure"],
+                row["light_level"],
+            )
+            for row in rows
+        ])
+        return
+    # Insert against the Core table: the ORM bulk path splits the batch into one
+    # statement per run of rows with the same non-NULL columns.
+    for table, group in route_rows(rows, lambda row: row["timestamp"]).items():
+        if returning:
+            statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+            for row, inserted in zip(group, db.session.execute(statement, group)):
+                row["id"] = inserted.id
+        else:
+            db.session.execute(insert(table), group)
+    if returning:
+        update_latest(rows)
+    else:
+        refresh_latest(sorted({row["sensor_id"] for row in rows}))
+    update_rollups(rows)
+
+
+def readings_committed(rows, publish=True):
+    """
+    Must be called after a commit that inserted reading rows.
+    Invalidates cached responses of every sensor the rows belong to, and of
+    listings that include reading data, and, unless publish is False, wakes the
+    stream feed so live stream subscribers get the rows without waiting for its
+    next poll.
+    """
+    if rows:
+        response_cache.invalidate("sensor_data", *{f"sensor:{row['sensor_id']}" for row in rows})
+    if publish:
+        stream_feed.wake()
+
+
+def ingest_batch(items):
+    """
+    Validates a list of readings, inserts the valid ones in a single bulk insert
+    and commits once. Returns a per-item result list in submission order.
+    """
+    results = []
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append((index, parse_reading(item)))
+        except ReadingError as e:
+            results.append({"index": index, "status": "rejected", "message": str(e)})
+
+    known_ids = existing_sensor_ids(row["sensor_id"] for _, row in parsed)
+    rows = []
+    for index, row in parsed:
+        if row["sensor_id"] in known_ids:
+            rows.append(row)
+            results.append({"index": index, "status": "accepted"})
+        else:
+            results.append({
+                "index": index,
+                "status": "rejected",
+                "message": f"Sensor with id {row['sensor_id']} not found.",
+            })
+
+    insert_readings(rows)
+    db.session.commit()
+    readings_committed(rows)
+    results.sort(key=lambda result: result["index"])
+    return results
+
+
+def write_queued_readings(rows):
+    """
+    Group commit used by the write-behind ingest queue: one bulk insert and one
+    commit for a batch of readings that were validated when they were queued.
+    """
+    insert_readings(rows)
+    db.session.commit()
+    readings_committed(rows)
+
+
+ingest_queue = IngestQueue(write_queued_readings, app)
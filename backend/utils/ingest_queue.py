@@ -0,0 +1,180 @@
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+
+INGEST_MODES = ("sync", "async")
+_STOP = object()
+
+
+class IngestQueue:
+    """
+    Write-behind buffer for single readings. Requests put validated rows on a
+    bounded in-process queue and return immediately; one writer thread drains
+    it and hands batches to `write`, which inserts and commits them in a single
+    transaction (group commit). A batch is written once it holds batch_size rows
+    or flush_interval seconds after its first row arrived, whichever is first.
+
+    Readings still queued when the process exits are flushed by an atexit hook;
+    a hard kill loses them, which is the price of not waiting for the commit.
+
+    Configuration:
+      INGEST_MODE         sync (default) commits in the request, async queues
+      INGEST_QUEUE_SIZE   capacity of the queue; submissions beyond it are refused
+      INGEST_BATCH_SIZE   maximum rows per group commit
+      INGEST_FLUSH_MS     longest a row waits for its batch to fill up
+    """
+
+    def __init__(self, write, app=None):
+        self.write = write
+        self.app = None
+        self.enabled = False
+        self.batch_size = 500
+        self.flush_interval = 0.05
+        self._queue = None
+        self._thread = None
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._counters = dict(enqueued=0, rejected=0, committed=0, failed=0, batches=0)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        mode = app.config.get("INGEST_MODE", "sync")
+        if mode not in INGEST_MODES:
+            raise ValueError(f"Unknown INGEST_MODE: {mode}")
+        self.app = app
+        self.enabled = mode == "async"
+        self.batch_size = app.config.get("INGEST_BATCH_SIZE", 500)
+        self.flush_interval = app.config.get("INGEST_FLUSH_MS", 50) / 1000
+        self._queue = queue.Queue(maxsize=app.config.get("INGEST_QUEUE_SIZE", 10000))
+        atexit.register(self.shutdown)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def submit(self, row):
+        """
+        Queues one validated reading row. Returns False when the queue is full or
+        shutting down, in which case the caller should ask the client to retry.
+        """
+        if self._stopping:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("rejected")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+        # Anything that slipped in behind the stop marker
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.task_done()
+            else:
+                leftover.append(item)
+        if leftover:
+            self._commit(leftover)
+
+    def _commit(self, batch):
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                self.write(batch)
+        except Exception:
+            self.app.logger.exception("Failed to write %d queued readings", len(batch))
+            self._count("failed", len(batch))
+        else:
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+                self._counters["committed"] += len(batch)
+                self._counters["batches"] += 1
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+        Blocks until every queued reading has been written. Returns False on timeout.
+        """
+        if self._queue is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=30):
+        """
+        Stops accepting readings, writes what is queued and stops the writer thread.
+        """
+        if self._thread is None or self._stopping:
+            return
+        self._stopping = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = sorted(self._latencies)
+        percentile = lambda fraction: round(latencies[int(fraction * (len(latencies) - 1))] * 1000, 3) if latencies else None
+        return {
+            "mode": "async" if self.enabled else "sync",
+            "queueDepth": self._queue.qsize() if self._queue is not None else 0,
+            "queueCapacity": self._queue.maxsize if self._queue is not None else 0,
+            "batchSize": self.batch_size,
+            "flushIntervalMs": round(self.flush_interval * 1000),
+            **counters,
+            "commitLatencyMs": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1] * 1000, 3) if latencies else None,
+            },
+        }
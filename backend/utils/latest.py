@@ -0,0 +1,107 @@
+from sqlalchemy import and_, delete, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from config import app, db
+from models import Sensor, SensorData, SensorLatest
+from utils.partitions import partitioning_enabled, physical_tables
+
+SNAPSHOT_COLUMNS = ("temperature", "humidity", "pressure", "light_level")
+
+
+def _upsert():
+    # config only accepts SQLite and PostgreSQL databases
+    if db.session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(SensorLatest.__table__)
+    return postgresql.insert(SensorLatest.__table__)
+
+
+def update_latest(rows):
+    """
+    Moves the snapshot forward for newly inserted reading rows, which must carry
+    their "id". A row only replaces the snapshot when it is newer by (timestamp, id),
+    so late-arriving historical readings leave it alone.
+    The caller owns the transaction and must commit.
+    """
+    newest = {}
+    for row in rows:
+        current = newest.get(row["sensor_id"])
+        if current is None or (row["timestamp"], row["id"]) > (current["timestamp"], current["id"]):
+            newest[row["sensor_id"]] = row
+    if not newest:
+        return
+
+    table = SensorLatest.__table__
+    statement = _upsert()
+    excluded = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=["sensor_id"],
+        set_={column: excluded[column] for column in ("data_id", "timestamp", *SNAPSHOT_COLUMNS)},
+        where=or_(
+            excluded.timestamp > table.c.timestamp,
+            and_(excluded.timestamp == table.c.timestamp, excluded.data_id > table.c.data_id),
+        ),
+    )
+    db.session.execute(statement, [
+        {"sensor_id": sensor_id, "data_id": row["id"], "timestamp": row["timestamp"],
+         **{column: row.get(column) for column in SNAPSHOT_COLUMNS}}
+        for sensor_id, row in newest.items()
+    ])
+
+
+def refresh_statements(sensor_ids):
+    """
+    DELETE and INSERT ... SELECT that recompute the snapshot of the given sensors
+    (a list of ids or a SELECT of ids) from sensor_data. The newest reading of each
+    sensor is found with one seek on the (sensor_id, timestamp, id) index; when
+    sensor_data is partitioned, partitions are tried newest first and COALESCE
+    stops at the first one holding a reading.
+    """
+    def newest_id(history):
+        return (
+            db.select(history.c.id)
+            .where(history.c.sensor_id == Sensor.id)
+            .order_by(history.c.timestamp.desc(), history.c.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    partitions = physical_tables() if partitioning_enabled() else []
+    if partitions:
+        # The trailing NULL keeps COALESCE valid with a single partition
+        latest_id = func.coalesce(*[newest_id(table) for table in reversed(partitions)], None)
+    else:
+        latest_id = newest_id(SensorData.__table__.alias())
+    source = (
+        db.select(
+            SensorData.sensor_id,
+            SensorData.id,
+            SensorData.timestamp,
+            *[getattr(SensorData, column) for column in SNAPSHOT_COLUMNS],
+        )
+        .select_from(Sensor)
+        .join(SensorData, SensorData.id == latest_id)
+        .where(Sensor.id.in_(sensor_ids))
+    )
+    return (
+        delete(SensorLatest).where(SensorLatest.sensor_id.in_(sensor_ids)),
+        SensorLatest.__table__.insert().from_select(
+            ["sensor_id", "data_id", "timestamp", *SNAPSHOT_COLUMNS], source
+        ),
+    )
+
+
+def refresh_latest(sensor_ids):
+    """
+    Recomputes the snapshot of the given sensors from raw data. Used where the
+    new latest reading is not known up front: after updates and deletes, and
+    after bulk loads that do not return ids. The caller owns the transaction and must commit.
+    """
+    for statement in refresh_statements(sensor_ids):
+        db.session.execute(statement)
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
+        refresh_latest(db.select(Sensor.id))
+        db.session.commit()
+        print(f"Snapshot rebuilt for {SensorLatest.query.count()} sensors.")
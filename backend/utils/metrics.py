@@ -0,0 +1,234 @@
+import heapq
+import sqlite3
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements quoted by the slow-request log, slowest first
+SLOW_LOG_STATEMENTS = 5
+SLOW_LOG_SQL_CHARS = 500
+
+
+class RowCountingCursor(sqlite3.Cursor):
+    """
+    sqlite3 reports rowcount -1 for SELECTs, so rows returned are counted as they
+    are fetched. SQLAlchemy fetches through these three methods only.
+    """
+
+    rows_fetched = 0
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self.rows_fetched += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.rows_fetched += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self.rows_fetched += len(rows)
+        return rows
+
+
+class RowCountingConnection(sqlite3.Connection):
+    """
+    Passed as sqlite3.connect(factory=...) so every cursor SQLAlchemy opens counts its rows.
+    """
+
+    def cursor(self, factory=RowCountingCursor):
+        return super().cursor(factory)
+
+
+class _EndpointStats:
+    __slots__ = ("buckets", "latency_sum", "requests", "statements", "sql_seconds", "rows", "response_bytes")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.response_bytes = 0
+
+
+def _labels(**labels):
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request instrumentation built on Flask request hooks and
+    SQLAlchemy cursor events: a latency histogram, responses by status, and for
+    every request the SQL statements it ran, their cumulative time, the rows they
+    returned and the response size. render() produces the Prometheus text format.
+
+    Requests slower than SLOW_REQUEST_MS are logged with their slowest statements.
+    Numbers are kept per process; with several gunicorn workers each scrape sees
+    the worker that answered it.
+
+    Configuration:
+      METRICS_ENABLED   instrument requests and serve /metrics (default on)
+      SLOW_REQUEST_MS   log requests slower than this; 0 disables the log
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_seconds = 0
+        self.logger = None
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._statuses = {}
+        self._collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.slow_seconds = app.config.get("SLOW_REQUEST_MS", 0) / 1000
+        self.logger = app.logger
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def add_collector(self, collect):
+        """
+        Registers a callable returning extra samples for render(), as a list of
+        (name, type, help, [(labels dict, value), ...]). Called on every scrape.
+        """
+        self._collectors.append(collect)
+
+    # --- Collection ---
+
+    def _before_request(self):
+        g._metrics = {"started": time.perf_counter(), "statements": 0, "sql_seconds": 0.0,
+                      "rows": 0, "cursors": [], "slowest": []}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and has_request_context() and "_metrics" in g:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None or not has_request_context() or "_metrics" not in g:
+            return
+        elapsed = time.perf_counter() - started
+        stats = g._metrics
+        stats["statements"] += 1
+        stats["sql_seconds"] += elapsed
+        if isinstance(cursor, RowCountingCursor):
+            # Rows are fetched after this event; read the count once the request is done
+            stats["cursors"].append(cursor)
+        elif cursor.rowcount >= 0 and not (context.isinsert or context.isupdate or context.isdelete):
+            stats["rows"] += cursor.rowcount
+        if self.slow_seconds:
+            # Keep only the slowest few; the counter breaks ties without comparing strings
+            entry = (elapsed, stats["statements"], statement)
+            if len(stats["slowest"]) < SLOW_LOG_STATEMENTS:
+                heapq.heappush(stats["slowest"], entry)
+            else:
+                heapq.heappushpop(stats["slowest"], entry)
+
+    def _after_request(self, response):
+        stats = g.pop("_metrics", None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats["started"]
+        rows = stats["rows"] + sum(cursor.rows_fetched for cursor in stats["cursors"])
+        # Measuring a streamed body would drain it here, and an SSE stream never ends
+        response_bytes = 0 if response.is_streamed else response.calculate_content_length() or 0
+        endpoint = request.endpoint or "<unmatched>"
+        key = (endpoint, request.method)
+
+        with self._lock:
+            endpoint_stats = self._endpoints.get(key)
+            if endpoint_stats is None:
+                endpoint_stats = self._endpoints[key] = _EndpointStats()
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if elapsed <= bound), len(LATENCY_BUCKETS))
+            endpoint_stats.buckets[bucket] += 1
+            endpoint_stats.latency_sum += elapsed
+            endpoint_stats.requests += 1
+            endpoint_stats.statements += stats["statements"]
+            endpoint_stats.sql_seconds += stats["sql_seconds"]
+            endpoint_stats.rows += rows
+            endpoint_stats.response_bytes += response_bytes
+            status_key = (endpoint, request.method, response.status_code)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+        if self.slow_seconds and elapsed >= self.slow_seconds:
+            self._log_slow_request(elapsed, stats, rows, response)
+        return response
+
+    def _log_slow_request(self, elapsed, stats, rows, response):
+        lines = [
+            f"Slow request {request.method} {request.full_path.rstrip('?')} -> {response.status_code}: "
+            f"{elapsed * 1000:.1f} ms, {stats['statements']} SQL statements in "
+            f"{stats['sql_seconds'] * 1000:.1f} ms, {rows} rows"
+        ]
+        # Statement text only: parameters may hold credentials
+        for seconds, _, statement in sorted(stats["slowest"], reverse=True):
+            sql = " ".join(statement.split())
+            if len(sql) > SLOW_LOG_SQL_CHARS:
+                sql = sql[:SLOW_LOG_SQL_CHARS] + "..."
+            lines.append(f"  {seconds * 1000:8.1f} ms  {sql}")
+        self.logger.warning("\n".join(lines))
+
+    # --- Exposition ---
+
+    def render(self):
+        with self._lock:
+            endpoints = {key: (list(stats.buckets), stats.latency_sum, stats.requests, stats.statements,
+                               stats.sql_seconds, stats.rows, stats.response_bytes)
+                         for key, stats in self._endpoints.items()}
+            statuses = dict(self._statuses)
+
+        lines = [
+            "# HELP http_requests_total Requests answered, by endpoint, method and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (endpoint, method, status), count in sorted(statuses.items()):
+            lines.append(f"http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Time from the first request hook to the response object.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (endpoint, method), (buckets, latency_sum, requests, *_) in sorted(endpoints.items()):
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), buckets):
+                cumulative += count
+                lines.append(f"http_request_duration_seconds_bucket{_labels(endpoint=endpoint, method=method, le=bound)} {cumulative}")
+            lines.append(f"http_request_duration_seconds_sum{_labels(endpoint=endpoint, method=method)} {latency_sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{_labels(endpoint=endpoint, method=method)} {requests}")
+
+        totals = (
+            ("http_request_sql_statements_total", "SQL statements executed while handling requests.", 3),
+            ("http_request_sql_seconds_total", "Time spent executing SQL while handling requests.", 4),
+            ("http_request_sql_rows_total", "Rows returned by SQL statements while handling requests.", 5),
+            ("http_response_bytes_total", "Response body bytes, excluding streamed responses.", 6),
+        )
+        for name, help_text, index in totals:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (endpoint, method), values in sorted(endpoints.items()):
+                value = values[index]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f"{name}{_labels(endpoint=endpoint, method=method)} {value}")
+
+        for collect in self._collectors:
+            for name, kind, help_text, samples in collect():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(**labels) if labels else ''} {value}")
+        return "\n".join(lines) + "\n"
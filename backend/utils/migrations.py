@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from config import app, db
+from models import Sensor, SensorData, SensorLatest, SensorRollup
+from utils.latest import refresh_statements
+from utils.partitions import ensure_storage_layout
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """
+    Registers a schema migration. Migrations run in version order, each in its own
+    transaction, and must be idempotent because db.create_all() may already have
+    created the objects they add on a fresh database.
+    """
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+
+def _sqlite_table_sql(connection, table_name):
+    return connection.scalar(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": table_name},
+    )
+
+
+@migration(1, "Add (sensor_id, timestamp, id) index to sensor_data")
+def _add_sensor_data_time_index(connection):
+    for index in SensorData.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+@migration(2, "Store sensor_rollups as a WITHOUT ROWID table")
+def _rebuild_rollups_without_rowid(connection):
+    if connection.dialect.name != "sqlite":
+        return
+    table_sql = _sqlite_table_sql(connection, "sensor_rollups")
+    if table_sql is None:
+        SensorRollup.__table__.create(connection)
+        return
+    if "WITHOUT ROWID" in table_sql.upper():
+        return
+    columns = ", ".join(column.name for column in SensorRollup.__table__.columns)
+    connection.execute(text("ALTER TABLE sensor_rollups RENAME TO sensor_rollups_old"))
+    SensorRollup.__table__.create(connection)
+    connection.execute(text(f"INSERT INTO sensor_rollups ({columns}) SELECT {columns} FROM sensor_rollups_old"))
+    connection.execute(text("DROP TABLE sensor_rollups_old"))
+
+
+@migration(3, "Add sensor_latest snapshot table")
+def _add_sensor_latest(connection):
+    SensorLatest.__table__.create(connection, checkfirst=True)
+    for statement in refresh_statements(select(Sensor.id)):
+        connection.execute(statement)
+
+
+@migration(4, "Add per-sensor retention_days")
+def _add_sensor_retention_days(connection):
+    if "retention_days" not in {column["name"] for column in inspect(connection).get_columns("sensors")}:
+        connection.execute(text("ALTER TABLE sensors ADD COLUMN retention_days INTEGER"))
+
+
+def run_migrations():
+    """
+    Applies every migration not yet recorded in schema_migrations.
+    Must be called inside an application context. Returns the versions applied.
+    """
+    applied = []
+    with db.engine.begin() as connection:
+        migration_metadata.create_all(connection)
+        done = set(connection.scalars(select(schema_migrations.c.version)))
+
+    for version, description, func in MIGRATIONS:
+        if version in done:
+            continue
+        with db.engine.begin() as connection:
+            func(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+
+    if applied and db.engine.dialect.name == "sqlite":
+        # Refresh planner statistics so new indexes are picked up immediately
+        with db.engine.begin() as connection:
+            connection.execute(text("PRAGMA optimize"))
+    ensure_storage_layout()
+    return applied
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
+        applied = run_migrations()
+        print(f"Schema up to date ({len(applied)} migrations applied).")
@@ -0,0 +1,289 @@
+import argparse
+from datetime import datetime
+from sqlalchemy import Column, Index, MetaData, Table, false, func, insert, select, text, union_all
+from sqlalchemy.orm import aliased
+from config import app, db
+from models import SensorData
+from utils.timeseries import utc_now
+
+PARTITIONING_MODES = ("none", "monthly")
+# Every partition allocates ids from month * PARTITION_ID_SPAN upwards, so an id
+# tells which partition holds the row and ids stay unique across partitions
+PARTITION_ID_SPAN = 10 ** 10
+
+_partition_metadata = MetaData()
+
+
+def partitioning_enabled():
+    return app.config["SENSOR_DATA_PARTITIONING"] == "monthly"
+
+
+def month_of(timestamp):
+    """
+    Partition key (YYYYMM as an int) of a datetime or of a timestamp in SQLite text form.
+    """
+    if isinstance(timestamp, str):
+        return int(timestamp[0:4] + timestamp[5:7])
+    return timestamp.year * 100 + timestamp.month
+
+
+def month_start(month):
+    return datetime(month // 100, month % 100, 1)
+
+
+def month_end(month):
+    year, month = divmod(month, 100)
+    return datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+
+
+def partition_table(month):
+    """
+    Table object of one monthly partition. Same columns as sensor_data, its own
+    copy of the (sensor_id, timestamp, id) index, and AUTOINCREMENT so the id
+    sequence can be seeded at the partition's id range.
+    """
+    name = f"sensor_data_{month}"
+    table = _partition_metadata.tables.get(name)
+    if table is None:
+        table = Table(
+            name,
+            _partition_metadata,
+            *[
+                Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+                for column in SensorData.__table__.columns
+            ],
+            Index(f"ix_{name}_sensor_id_timestamp", "sensor_id", "timestamp", "id"),
+            sqlite_autoincrement=True,
+        )
+    return table
+
+
+def existing_months(connection=None):
+    if not partitioning_enabled():
+        return []
+    connection = connection or db.session.connection()
+    names = connection.scalars(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' "
+        "AND name GLOB 'sensor_data_[0-9][0-9][0-9][0-9][0-9][0-9]'"
+    ))
+    return sorted(int(name.rsplit("_", 1)[1]) for name in names)
+
+
+def _rebuild_view(connection, months):
+    """
+    (Re)creates sensor_data as a UNION ALL view of the partitions, so every reader
+    that selects from SensorData keeps working unchanged. SQLite pushes WHERE
+    clauses into each arm and merges arms in index order for ORDER BY.
+    """
+    columns = ", ".join(column.name for column in SensorData.__table__.columns)
+    body = " UNION ALL ".join(f"SELECT {columns} FROM {partition_table(month).name}" for month in months)
+    connection.execute(text("DROP VIEW IF EXISTS sensor_data"))
+    connection.execute(text(f"CREATE VIEW sensor_data AS {body}"))
+
+
+def _create_partition(connection, month):
+    table = partition_table(month)
+    table.create(connection, checkfirst=True)
+    connection.execute(
+        text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+        ),
+        {"name": table.name, "seq": month * PARTITION_ID_SPAN},
+    )
+
+
+def ensure_partitions(months, connection=None):
+    """
+    Creates the partitions for the given months that do not exist yet and adds
+    them to the sensor_data view. Runs in the caller's transaction.
+    """
+    connection = connection or db.session.connection()
+    existing = set(existing_months(connection))
+    missing = sorted(set(months) - existing)
+    for month in missing:
+        _create_partition(connection, month)
+    if missing:
+        _rebuild_view(connection, sorted(existing | set(missing)))
+
+
+def drop_partition(month, connection=None):
+    """
+    Removes a whole month of raw readings by dropping its table, which costs the
+    same whatever the number of rows. Rollups and the latest snapshot are kept.
+    """
+    connection = connection or db.session.connection()
+    months = [existing for existing in existing_months(connection) if existing != month]
+    if not months:
+        # The view needs at least one arm; keep an empty partition for the current month
+        current = month_of(utc_now())
+        _create_partition(connection, current)
+        months = [current]
+    _rebuild_view(connection, months)
+    partition_table(month).drop(connection, checkfirst=True)
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": partition_table(month).name})
+
+
+def drop_storage_layout():
+    """
+    Drops the sensor_data view and every partition so that db.drop_all(), which
+    only knows the plain table, can rebuild the schema from scratch.
+    """
+    with db.engine.begin() as connection:
+        if connection.dialect.name != "sqlite" or _sensor_data_kind(connection) != "view":
+            return
+        connection.execute(text("DROP VIEW sensor_data"))
+        for month in existing_months(connection):
+            partition_table(month).drop(connection)
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name GLOB 'sensor_data_[0-9]*'"))
+
+
+def physical_tables(start=None, end=None):
+    """
+    Tables that may hold readings with start <= timestamp < end, in time order:
+    the overlapping partitions, or the sensor_data table when not partitioned.
+    """
+    if not partitioning_enabled():
+        return [SensorData.__table__]
+    return [
+        partition_table(month)
+        for month in existing_months()
+        if (start is None or month_end(month) > start) and (end is None or month_start(month) < end)
+    ]
+
+
+def table_for_timestamp(timestamp):
+    """
+    Table that holds (or would hold) a reading with the given timestamp.
+    """
+    if not partitioning_enabled():
+        return SensorData.__table__
+    return partition_table(month_of(timestamp))
+
+
+def route_rows(rows, month_key):
+    """
+    Groups rows by the table they belong in, creating missing partitions.
+    month_key returns a row's timestamp (datetime or SQLite text).
+    """
+    if not partitioning_enabled():
+        return {SensorData.__table__: rows}
+    groups = {}
+    for row in rows:
+        groups.setdefault(month_of(month_key(row)), []).append(row)
+    ensure_partitions(groups)
+    return {partition_table(month): groups[month] for month in sorted(groups)}
+
+
+def sensor_data_entity(start=None, end=None):
+    """
+    Entity to select readings in [start, end) from. Without partitioning this is
+    SensorData itself; with it, SensorData mapped onto a UNION ALL of only the
+    partitions the range touches, so queries written against the returned
+    entity's attributes skip every other partition.
+    """
+    if not partitioning_enabled():
+        return SensorData
+    tables = physical_tables(start, end)
+    if not tables:
+        source = select(SensorData.__table__).where(false()).subquery("sensor_data_range")
+    elif len(tables) == 1:
+        source = tables[0].alias("sensor_data_range")
+    else:
+        source = union_all(*[select(table) for table in tables]).subquery("sensor_data_range")
+    return aliased(SensorData, source, adapt_on_names=True)
+
+
+def oldest_timestamp_expression(sensor_id):
+    """
+    Correlated scalar expression for the timestamp of the oldest stored reading
+    of `sensor_id` (a column or value), NULL when there is none. Each partition
+    answers with one index seek; they are tried oldest first.
+    """
+    def oldest(table):
+        return select(func.min(table.c.timestamp)).where(table.c.sensor_id == sensor_id).scalar_subquery()
+
+    if not partitioning_enabled():
+        return oldest(SensorData.__table__.alias())
+    # The trailing NULL keeps COALESCE valid with zero or one partition
+    return func.coalesce(*[oldest(table) for table in physical_tables()], None, None)
+
+
+def time_bounds(sensor_id):
+    """
+    (first, last) reading timestamp of a sensor. Each partition answers min/max
+    with one index seek, so only the oldest and newest non-empty ones are read.
+    """
+    tables = physical_tables()
+    first = last = None
+    for table in tables:
+        first = db.session.scalar(select(func.min(table.c.timestamp)).where(table.c.sensor_id == sensor_id))
+        if first is not None:
+            break
+    for table in reversed(tables):
+        last = db.session.scalar(select(func.max(table.c.timestamp)).where(table.c.sensor_id == sensor_id))
+        if last is not None:
+            break
+    return first, last
+
+
+def _sensor_data_kind(connection):
+    return connection.scalar(text("SELECT type FROM sqlite_master WHERE name = 'sensor_data'"))
+
+
+def ensure_storage_layout():
+    """
+    Brings the sensor_data storage in line with SENSOR_DATA_PARTITIONING. Switching
+    an existing database to monthly moves its rows into partitions (keeping their
+    ids) and replaces the table with the view; this is one-way.
+    """
+    with db.engine.begin() as connection:
+        # config refuses monthly partitioning on other databases
+        if connection.dialect.name != "sqlite":
+            return
+        kind = _sensor_data_kind(connection)
+        if not partitioning_enabled():
+            if kind == "view":
+                raise RuntimeError("sensor_data is partitioned; set SENSOR_DATA_PARTITIONING=monthly")
+            return
+        if kind == "view":
+            return
+
+        source = SensorData.__table__
+        months = {month_of(utc_now())}
+        if kind == "table":
+            months |= {int(month) for month in connection.scalars(
+                select(func.distinct(func.strftime("%Y%m", source.c.timestamp)))
+            )}
+        for month in sorted(months):
+            _create_partition(connection, month)
+            if kind == "table":
+                table = partition_table(month)
+                connection.execute(insert(table).from_select(
+                    [column.name for column in source.columns],
+                    select(source).where(source.c.timestamp >= month_start(month), source.c.timestamp < month_end(month)),
+                ))
+        if kind == "table":
+            connection.execute(text("DROP TABLE sensor_data"))
+        _rebuild_view(connection, sorted(months))
+        print(f"sensor_data partitioned into {len(months)} monthly tables.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or manage monthly sensor_data partitions.")
+    parser.add_argument("--drop-before", metavar="YYYYMM", type=int, help="Drop every partition older than this month.")
+    args = parser.parse_args()
+    with app.app_context():
+        if not partitioning_enabled():
+            parser.error("SENSOR_DATA_PARTITIONING is not monthly")
+        ensure_storage_layout()
+        if args.drop_before:
+            for month in existing_months():
+                if month < args.drop_before:
+                    drop_partition(month)
+                    print(f"Dropped partition {month}.")
+            db.session.commit()
+        for month in existing_months():
+            table = partition_table(month)
+            rows = db.session.scalar(select(func.count()).select_from(table))
+            print(f"{table.name}: {rows} readings")
@@ -0,0 +1,164 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from werkzeug.security import check_password_hash, generate_password_hash
+
+ARGON2_PREFIX = "$argon2"
+
+
+class PasswordPoolBusy(Exception):
+    """
+    Raised when the password pool is at capacity; the caller should answer 503.
+    """
+
+
+def _argon2():
+    try:
+        import argon2
+    except ImportError as e:
+        raise RuntimeError("argon2 password hashes require the 'argon2-cffi' package") from e
+    return argon2
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with the configured method. Methods use
+    werkzeug's syntax: "scrypt:N:r:p", "pbkdf2:sha256:iterations", or
+    "argon2:time_cost:memory_kib:parallelism" (argon2 needs argon2-cffi).
+    Hashes made with any supported method verify regardless of the current one;
+    needs_rehash tells whether a stored hash uses other parameters.
+    """
+
+    def __init__(self, method="scrypt"):
+        self.configure(method)
+
+    def configure(self, method):
+        self.method = method
+        if method.split(":", 1)[0] == "argon2":
+            argon2 = _argon2()
+            params = [int(value) for value in method.split(":")[1:]]
+            names = ("time_cost", "memory_cost", "parallelism")
+            self._argon2 = argon2.PasswordHasher(**dict(zip(names, params)))
+            self._prefix = None
+        else:
+            self._argon2 = None
+            # werkzeug fills in defaults ("scrypt" -> "scrypt:32768:8:1"), so compare
+            # stored hashes against the prefix it actually produces
+            self._prefix = generate_password_hash("", method).split("$", 1)[0]
+
+    def hash(self, password):
+        if self._argon2 is not None:
+            return self._argon2.hash(password)
+        return generate_password_hash(password, self.method)
+
+    def verify(self, password_hash, password):
+        if password_hash.startswith(ARGON2_PREFIX):
+            argon2 = _argon2()
+            try:
+                return argon2.PasswordHasher().verify(password_hash, password)
+            except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+                return False
+        return check_password_hash(password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        if self._argon2 is not None:
+            return not password_hash.startswith(ARGON2_PREFIX) or self._argon2.check_needs_rehash(password_hash)
+        return password_hash.split("$", 1)[0] != self._prefix
+
+    def verify_and_update(self, password_hash, password):
+        """
+        Returns (valid, new_hash). new_hash is set when the password is valid but
+        its stored hash uses an outdated method, so login can upgrade it.
+        """
+        if not self.verify(password_hash, password):
+            return False, None
+        if self.needs_rehash(password_hash):
+            return True, self.hash(password)
+        return True, None
+
+
+class PasswordPool:
+    """
+    Runs password hashing off the request threads on a fixed number of worker
+    threads. scrypt, PBKDF2 and argon2 release the GIL, so a login storm keeps at
+    most `workers` cores busy and other requests keep being served. At most
+    `queue_size` jobs wait behind the busy workers; beyond that submissions fail
+    fast with PasswordPoolBusy instead of piling up.
+
+    Configuration:
+      PASSWORD_HASH_METHOD      method for new hashes (see PasswordHasher)
+      PASSWORD_WORKERS          worker threads, defaults to the number of CPUs
+      PASSWORD_QUEUE_SIZE       jobs allowed to wait for a worker
+      PASSWORD_TIMEOUT_SECONDS  longest a request waits for its job
+    """
+
+    def __init__(self, app=None):
+        self.hasher = PasswordHasher()
+        self.workers = os.cpu_count() or 1
+        self.queue_size = 16
+        self.timeout = 10
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self._counters = dict(completed=0, rejected=0, timedOut=0, rehashed=0)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.configure(
+            app.config.get("PASSWORD_HASH_METHOD", "scrypt"),
+            app.config.get("PASSWORD_WORKERS"),
+            app.config.get("PASSWORD_QUEUE_SIZE", 16),
+            app.config.get("PASSWORD_TIMEOUT_SECONDS", 10),
+        )
+
+    def configure(self, method, workers=None, queue_size=16, timeout=10):
+        self.hasher.configure(method)
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _run(self, function, *args):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise PasswordPoolBusy()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job finishes, even if the request stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(self.timeout)
+        except TimeoutError:
+            self._count("timedOut")
+            raise PasswordPoolBusy()
+        self._count("completed")
+        return result
+
+    def hash(self, password):
+        return self._run(self.hasher.hash, password)
+
+    def verify(self, password_hash, password):
+        return self._run(self.hasher.verify, password_hash, password)
+
+    def verify_and_update(self, password_hash, password):
+        valid, new_hash = self._run(self.hasher.verify_and_update, password_hash, password)
+        if new_hash is not None:
+            self._count("rehashed")
+        return valid, new_hash
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {"method": self.hasher.method, "workers": self.workers, "queueSize": self.queue_size, **counters}
@@ -0,0 +1,225 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import g, has_request_context, jsonify, request
+from flask_jwt_extended import get_current_user, verify_jwt_in_request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[A-Za-z0-9_.]+-[0-9a-f]{8}$")
+# Rows of the pstats report returned by summary()
+STATS_LINES = 40
+
+
+class StackSampler:
+    """
+    Sampling profiler for one thread: every `interval` seconds it records the
+    thread's current Python stack. The result is in the folded format
+    ("outer;inner;leaf count") read by flamegraph.pl and speedscope.
+    A sample can only be taken when the sampled thread releases the GIL, so the
+    effective resolution is bounded by sys.getswitchinterval() (5 ms by default).
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    Admin-only, on-demand profiling of single requests. A request carrying the
+    header `X-Profile: cprofile|sample` (or the query parameter profile=...) and
+    an admin's access token runs under cProfile or under StackSampler. The
+    profile, the SQL statements the request executed and its timing are stored
+    in PROFILING_DIR, and the response carries an X-Profile-Id header to fetch
+    them from /profiles/<id>.
+
+    With PROFILING_ENABLED off (the default) no hook or event listener is
+    installed, so requests pay nothing for the feature.
+
+    Configuration:
+      PROFILING_ENABLED    install the hooks
+      PROFILING_DIR        where profiles are written (default: instance/profiles)
+      PROFILING_KEEP       newest profiles kept; older ones are deleted
+      PROFILING_SAMPLE_MS  StackSampler interval
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.directory = None
+        self.keep = 100
+        self.sample_interval = 0.001
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PROFILING_ENABLED", False)
+        self.directory = app.config.get("PROFILING_DIR") or os.path.join(app.instance_path, "profiles")
+        self.keep = app.config.get("PROFILING_KEEP", 100)
+        self.sample_interval = app.config.get("PROFILING_SAMPLE_MS", 1) / 1000
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _requested_mode(self):
+        return request.headers.get("X-Profile") or request.args.get("profile")
+
+    def _before_request(self):
+        mode = self._requested_mode()
+        if not mode:
+            return None
+        if mode not in PROFILE_MODES:
+            return jsonify({"message": f"X-Profile must be one of: {', '.join(PROFILE_MODES)}."}), 400
+        verify_jwt_in_request(optional=True, locations=["headers"])
+        user = get_current_user()
+        if user is None or not user.is_admin:
+            return jsonify({"message": "Profiling requires an admin access token."}), 403
+
+        state = {"mode": mode, "statements": [], "started": time.perf_counter()}
+        if mode == "cprofile":
+            state["profiler"] = cProfile.Profile()
+            state["profiler"].enable()
+        else:
+            state["profiler"] = StackSampler(threading.get_ident(), self.sample_interval)
+            state["profiler"].start()
+        g._profile = state
+        return None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and has_request_context() and "_profile" in g:
+            context._profile_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profile_started", None)
+        if started is not None and has_request_context() and "_profile" in g:
+            g._profile["statements"].append({
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+                "sql": " ".join(statement.split()),
+                "executemany": executemany,
+            })
+
+    def _after_request(self, response):
+        state = g.pop("_profile", None)
+        if state is None:
+            return response
+        profiler = state["profiler"]
+        if state["mode"] == "cprofile":
+            profiler.disable()
+        else:
+            profiler.stop()
+        elapsed = time.perf_counter() - state["started"]
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.directory, exist_ok=True)
+        if state["mode"] == "cprofile":
+            profiler.dump_stats(self._path(profile_id, "pstats"))
+        else:
+            with open(self._path(profile_id, "folded"), "w") as output:
+                output.write(profiler.folded())
+        meta = {
+            "id": profile_id,
+            "mode": state["mode"],
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "elapsedMs": round(elapsed * 1000, 3),
+            "sqlMs": round(sum(statement["ms"] for statement in state["statements"]), 3),
+            "statements": state["statements"],
+        }
+        with open(self._path(profile_id, "json"), "w") as output:
+            json.dump(meta, output, indent=2)
+        self._prune()
+        response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    # --- Storage ---
+
+    def _path(self, profile_id, extension):
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def _prune(self):
+        ids = self.list_ids()
+        for profile_id in ids[self.keep:]:
+            for extension in ("json", "pstats", "folded"):
+                try:
+                    os.remove(self._path(profile_id, extension))
+                except FileNotFoundError:
+                    pass
+
+    def list_ids(self):
+        """
+        Stored profile ids, newest first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        ids = [name[:-5] for name in os.listdir(self.directory) if name.endswith(".json")]
+        return sorted((profile_id for profile_id in ids if PROFILE_ID.match(profile_id)), reverse=True)
+
+    def raw_path(self, profile_id):
+        """
+        Path of the raw profile (pstats or folded stacks), or None if there is no such profile.
+        """
+        if not PROFILE_ID.match(profile_id):
+            return None
+        for extension in ("pstats", "folded"):
+            path = self._path(profile_id, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def summary(self, profile_id):
+        """
+        Stored metadata and SQL of a profile plus a readable report: the top
+        functions by cumulative time for cProfile, the folded stacks for sampling.
+        """
+        path = self.raw_path(profile_id)
+        if path is None:
+            return None
+        with open(self._path(profile_id, "json")) as meta_file:
+            meta = json.load(meta_file)
+        if path.endswith(".pstats"):
+            report = io.StringIO()
+            stats = pstats.Stats(path, stream=report)
+            stats.strip_dirs().sort_stats("cumulative").print_stats(STATS_LINES)
+            meta["report"] = report.getvalue()
+        else:
+            with open(path) as folded:
+                meta["report"] = folded.read()
+        return meta
@@ -0,0 +1,269 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, delete, func, text, tuple_
+from config import app, db, response_cache
+from models import Sensor, SensorData, SensorRollup
+from utils.partitions import drop_partition, existing_months, month_end, partition_table, partitioning_enabled, physical_tables
+from utils.timeseries import utc_now
+
+
+def _raw_cutoff(now, days):
+    # Whole days expire at once: a day's rollups can then always be rebuilt from
+    # its raw readings, which a cutoff in the middle of a day would make lossy
+    return datetime.combine((now - timedelta(days=days)).date(), datetime.min.time())
+
+
+def retention_plan(now=None, sensor_ids=None):
+    """
+    Per-sensor raw data cutoffs: readings from days that ended more than the
+    sensor's retention_days (or RETENTION_RAW_DAYS when it is NULL) ago expire.
+    0 keeps data forever. The cutoff is always midnight (UTC).
+    Returns a list of (sensor_id, days, cutoff) for sensors with a limit.
+    """
+    now = now or utc_now()
+    default_days = app.config["RETENTION_RAW_DAYS"]
+    query = db.select(Sensor.id, Sensor.retention_days).order_by(Sensor.id)
+    if sensor_ids is not None:
+        query = query.where(Sensor.id.in_(sensor_ids))
+    plan = []
+    for sensor_id, days in db.session.execute(query):
+        days = default_days if days is None else days
+        if days > 0:
+            plan.append((sensor_id, days, _raw_cutoff(now, days)))
+    return plan
+
+
+def raw_cutoffs(sensor_ids, now=None):
+    """
+    {sensor_id: cutoff} for those of the given sensors whose readings expire.
+    Rollup buckets before a sensor's cutoff can no longer be rebuilt from raw data.
+    """
+    return {sensor_id: cutoff for sensor_id, _, cutoff in retention_plan(now, sensor_ids)}
+
+
+def minute_rollup_cutoff(now=None):
+    """
+    Time before which 1m rollup buckets expire, or None when they are kept forever.
+    """
+    now = now or utc_now()
+    days = app.config["RETENTION_1M_ROLLUP_DAYS"]
+    return now - timedelta(days=days) if days > 0 else None
+
+
+def _bytes_per_row(table_names, row_count):
+    """
+    Average bytes a row of the given tables takes with its indexes, from SQLite's
+    dbstat table when it is compiled in, otherwise from the size of the whole database.
+    """
+    if not row_count:
+        return 0
+    connection = db.session.connection()
+    if connection.dialect.name != "sqlite":
+        return None
+    try:
+        size = connection.scalar(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN :names "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN :names)"
+        ).bindparams(bindparam("names", expanding=True)), {"names": list(table_names)})
+    except Exception:
+        size = connection.scalar(text("PRAGMA page_count")) * connection.scalar(text("PRAGMA page_size"))
+    return (size or 0) / row_count
+
+
+def retention_report(now=None):
+    """
+    Dry run: what a retention pass would delete right now, per sensor, with an
+    estimate of the bytes it would free. Nothing is modified.
+    """
+    now = now or utc_now()
+    sensors = []
+    for sensor_id, days, cutoff in retention_plan(now):
+        rows = db.session.scalar(
+            db.select(func.count()).where(SensorData.sensor_id == sensor_id, SensorData.timestamp < cutoff)
+        )
+        sensors.append({"sensorId": sensor_id, "retentionDays": days, "cutoff": cutoff.isoformat(), "rows": rows})
+    raw_rows = sum(sensor["rows"] for sensor in sensors)
+    raw_per_row = _bytes_per_row(
+        [table.name for table in physical_tables()],
+        db.session.scalar(db.select(func.count()).select_from(SensorData)),
+    )
+
+    rollup_rows = 0
+    rollup_cutoff = minute_rollup_cutoff(now)
+    if rollup_cutoff is not None:
+        rollup_rows = db.session.scalar(
+            db.select(func.count()).where(SensorRollup.resolution == "1m", SensorRollup.bucket < rollup_cutoff)
+        )
+    rollup_per_row = _bytes_per_row(["sensor_rollups"], db.session.scalar(db.select(func.count()).select_from(SensorRollup)))
+
+    estimate = None
+    if raw_per_row is not None and rollup_per_row is not None:
+        estimate = round(raw_rows * raw_per_row + rollup_rows * rollup_per_row)
+    return {
+        "rawRows": raw_rows,
+        "rollup1mRows": rollup_rows,
+        "estimatedBytes": estimate,
+        "sensors": [sensor for sensor in sensors if sensor["rows"]],
+    }
+
+
+def _delete_in_batches(table, id_query, batch_size, pause):
+    """
+    Deletes the rows selected by id_query (a SELECT of primary keys) batch_size at a
+    time, committing after each batch and sleeping `pause` seconds in between so
+    other writers get the lock. Returns the number of rows deleted.
+    """
+    deleted = 0
+    while True:
+        ids = db.session.scalars(id_query.limit(batch_size)).all()
+        if not ids:
+            return deleted
+        db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def incremental_vacuum(max_pages=None, step=1000):
+    """
+    Returns free pages to the filesystem in steps of `step` pages, each its own
+    short write transaction. Only works on SQLite databases whose auto_vacuum is
+    INCREMENTAL. Returns the number of pages released.
+    """
+    if db.session.get_bind().dialect.name != "sqlite":
+        return 0
+    connection = db.session.connection()
+    if connection.scalar(text("PRAGMA auto_vacuum")) != 2:
+        return 0
+    db.session.commit()
+    released = 0
+    while max_pages is None or released < max_pages:
+        free = db.session.connection().scalar(text("PRAGMA freelist_count"))
+        if not free:
+            break
+        pages = min(step, free) if max_pages is None else min(step, free, max_pages - released)
+        # The sqlite3 module steps a PRAGMA only once, which frees a single page;
+        # executescript runs it to completion in its own transaction
+        db.session.connection().connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        db.session.commit()
+        freed = free - db.session.connection().scalar(text("PRAGMA freelist_count"))
+        if freed <= 0:
+            break
+        released += freed
+    return released
+
+
+def _drop_expired_partitions(plan):
+    """
+    With monthly partitioning, drops every partition that ends before the earliest
+    cutoff in one step instead of deleting its rows. Only possible when every
+    sensor has a retention limit; otherwise some rows in it must be kept.
+    Returns the number of readings dropped.
+    """
+    if not partitioning_enabled() or not plan:
+        return 0
+    if len(plan) < db.session.scalar(db.select(func.count()).select_from(Sensor)):
+        return 0
+    earliest = min(cutoff for _, _, cutoff in plan)
+    dropped = 0
+    for month in existing_months():
+        if month_end(month) > earliest:
+            break
+        rows = db.session.scalar(db.select(func.count()).select_from(partition_table(month)))
+        drop_partition(month)
+        db.session.commit()
+        print(f"Dropped partition {partition_table(month).name} ({rows} readings).")
+        dropped += rows
+    if dropped:
+        response_cache.invalidate("sensor_data", *[f"sensor:{sensor_id}" for sensor_id, _, _ in plan])
+    return dropped
+
+
+def apply_retention(now=None, batch_size=None, pause=None):
+    """
+    Deletes expired raw readings and 1m rollup buckets in bounded batches (whole
+    monthly partitions are dropped instead where possible), then
+    releases the freed pages with incremental vacuum. Hourly and daily rollups and
+    the latest-reading snapshot are kept, so old periods stay available in
+    aggregated form. Returns a summary dict.
+    """
+    now = now or utc_now()
+    batch_size = batch_size or app.config["RETENTION_BATCH_SIZE"]
+    pause = app.config["RETENTION_BATCH_PAUSE_MS"] / 1000 if pause is None else pause
+
+    plan = retention_plan(now)
+    raw_rows = _drop_expired_partitions(plan)
+    for sensor_id, _, cutoff in plan:
+        deleted = 0
+        for table in physical_tables(end=cutoff):
+            ids = (
+                db.select(table.c.id)
+                .where(table.c.sensor_id == sensor_id, table.c.timestamp < cutoff)
+                .order_by(table.c.timestamp)
+            )
+            deleted += _delete_in_batches(table, ids, batch_size, pause)
+        if deleted:
+            response_cache.invalidate("sensor_data", f"sensor:{sensor_id}")
+            print(f"Sensor {sensor_id}: deleted {deleted} readings older than {cutoff.isoformat()}.")
+        raw_rows += deleted
+
+    rollup_rows = 0
+    rollup_cutoff = minute_rollup_cutoff(now)
+    if rollup_cutoff is not None:
+        table = SensorRollup.__table__
+        while True:
+            keys = db.session.execute(
+                db.select(table.c.sensor_id, table.c.bucket)
+                .where(table.c.resolution == "1m", table.c.bucket < rollup_cutoff)
+                .limit(batch_size)
+            ).all()
+            if not keys:
+                break
+            db.session.execute(delete(table).where(
+                table.c.resolution == "1m",
+                tuple_(table.c.sensor_id, table.c.bucket).in_([tuple(key) for key in keys]),
+            ))
+            db.session.commit()
+            rollup_rows += len(keys)
+            if len(keys) < batch_size:
+                break
+            time.sleep(pause)
+
+    pages = incremental_vacuum()
+    return {"rawRows": raw_rows, "rollup1mRows": rollup_rows, "pagesReleased": pages}
+
+
+def enable_incremental_vacuum():
+    """
+    Switches an existing SQLite database to auto_vacuum=INCREMENTAL. This needs a
+    full VACUUM, which rewrites the file and locks it for the duration, so it is
+    a one-off maintenance step rather than part of the retention job.
+    """
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.exec_driver_sql("VACUUM")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expire old raw sensor data according to the retention settings.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+    parser.add_argument("--batch-size", type=int, help="Rows deleted per transaction.")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Convert the SQLite file to auto_vacuum=INCREMENTAL (runs a full VACUUM once).")
+    args = parser.parse_args()
+    stale_cache = response_cache.process_local_warning()
+    if stale_cache and not args.dry_run:
+        print(f"Warning: {stale_cache}", file=sys.stderr)
+    with app.app_context():
+        if args.enable_incremental_vacuum:
+            enable_incremental_vacuum()
+            print("auto_vacuum is now INCREMENTAL.")
+        if args.dry_run:
+            print(json.dumps(retention_report(), indent=2))
+        else:
+            print(json.dumps(apply_retention(), indent=2))
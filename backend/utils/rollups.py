@@ -0,0 +1,376 @@
+import argparse
+from datetime import timedelta
+from sqlalchemy import BigInteger, Integer, cast, delete, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from config import app, db, response_cache
+from models import SensorData, SensorRollup
+from utils.partitions import sensor_data_entity
+from utils.retention import minute_rollup_cutoff, raw_cutoffs
+from utils.timeseries import EPOCH, epoch_seconds, parse_timestamp, utc_now
+
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+METRIC_COLUMNS = ("temperature", "humidity", "pressure", "light_level")
+SQLITE_BUCKET_FORMATS = {
+    "1m": "%Y-%m-%d %H:%M:00.000000",
+    "1h": "%Y-%m-%d %H:00:00.000000",
+    "1d": "%Y-%m-%d 00:00:00.000000",
+}
+POSTGRESQL_BUCKET_UNITS = {"1m": "minute", "1h": "hour", "1d": "day"}
+
+
+def bucket_start(timestamp, resolution):
+    """
+    Start of the bucket of the given resolution that contains timestamp.
+    """
+    seconds = RESOLUTIONS[resolution]
+    return EPOCH + timedelta(seconds=int(epoch_seconds(timestamp) // seconds * seconds))
+
+
+def _aggregate(rows):
+    """
+    Folds reading rows into partial rollup rows keyed by (sensor_id, resolution, bucket).
+    """
+    rollups = {}
+    for row in rows:
+        seconds = epoch_seconds(row["timestamp"])
+        values = [(column, row.get(column)) for column in METRIC_COLUMNS]
+        for resolution, width in RESOLUTIONS.items():
+            key = (row["sensor_id"], resolution, int(seconds // width * width))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = {
+                    "sensor_id": key[0],
+                    "resolution": resolution,
+                    "bucket": EPOCH + timedelta(seconds=key[2]),
+                    "count": 0,
+                }
+                for column in METRIC_COLUMNS:
+                    rollup[f"{column}_min"] = None
+                    rollup[f"{column}_max"] = None
+                    rollup[f"{column}_sum"] = 0.0
+                    rollup[f"{column}_count"] = 0
+            rollup["count"] += 1
+            for column, value in values:
+                if value is None:
+                    continue
+                low = rollup[f"{column}_min"]
+                high = rollup[f"{column}_max"]
+                if low is None or value < low:
+                    rollup[f"{column}_min"] = value
+                if high is None or value > high:
+                    rollup[f"{column}_max"] = value
+                rollup[f"{column}_sum"] += value
+                rollup[f"{column}_count"] += 1
+    return list(rollups.values())
+
+
+def _merge_into_rollups(source=None, replace=False):
+    """
+    Upsert into sensor_rollups that merges partial aggregates into existing buckets,
+    or with `replace` overwrites them with complete ones.
+    With `source` (a SELECT producing rollup columns) it is an INSERT ... SELECT;
+    otherwise it expects executemany parameters.
+    """
+    table = SensorRollup.__table__
+    # config only accepts SQLite and PostgreSQL databases
+    if db.session.get_bind().dialect.name == "sqlite":
+        statement = sqlite.insert(table)
+        least = lambda a, b: func.min(func.coalesce(a, b), func.coalesce(b, a))
+        greatest = lambda a, b: func.max(func.coalesce(a, b), func.coalesce(b, a))
+    else:
+        statement = postgresql.insert(table)
+        least = func.least
+        greatest = func.greatest
+    if source is not None:
+        statement = statement.from_select([column.name for column in table.columns], source)
+
+    excluded = statement.excluded
+    if replace:
+        updates = {column.name: excluded[column.name] for column in table.columns if not column.primary_key}
+        return statement.on_conflict_do_update(index_elements=["sensor_id", "resolution", "bucket"], set_=updates)
+    updates = {"count": table.c["count"] + excluded["count"]}
+    for column in METRIC_COLUMNS:
+        updates[f"{column}_min"] = least(table.c[f"{column}_min"], excluded[f"{column}_min"])
+        updates[f"{column}_max"] = greatest(table.c[f"{column}_max"], excluded[f"{column}_max"])
+        updates[f"{column}_sum"] = table.c[f"{column}_sum"] + excluded[f"{column}_sum"]
+        updates[f"{column}_count"] = table.c[f"{column}_count"] + excluded[f"{column}_count"]
+    return statement.on_conflict_do_update(index_elements=["sensor_id", "resolution", "bucket"], set_=updates)
+
+
+def bucket_expression(resolution, column=SensorData.timestamp):
+    """
+    SQL expression for the start of the bucket of the given resolution containing
+    column, in the form bucket columns are stored in.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        # Same text layout SQLAlchemy uses to store DATETIME values in SQLite
+        return func.strftime(SQLITE_BUCKET_FORMATS[resolution], column)
+    return func.date_trunc(POSTGRESQL_BUCKET_UNITS[resolution], column)
+
+
+def epoch_bucket_expression(column, width):
+    """
+    SQL expression for the start of the `width`-second bucket containing the
+    timestamp column, in whole seconds since the epoch. Buckets are aligned to
+    the epoch, so equal widths line up across sensors and queries.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        seconds = cast(func.strftime("%s", column), Integer)
+    else:
+        seconds = cast(func.floor(func.extract("epoch", column)), BigInteger)
+    return seconds // width * width
+
+
+def merge_rollups_from_raw(*criteria, resolutions=RESOLUTIONS, replace=False):
+    """
+    Aggregates the sensor_data rows matching criteria inside the database and merges
+    them into the rollup tables, one INSERT ... SELECT ... GROUP BY per resolution.
+    Much faster than update_rollups for large row counts because no rows travel
+    through Python. With `replace` the aggregates overwrite the buckets instead,
+    so criteria must then cover whole buckets. The caller owns the transaction and must commit.
+    """
+    for resolution in resolutions:
+        bucket = bucket_expression(resolution)
+        columns = [SensorData.sensor_id, literal(resolution), bucket, func.count()]
+        for name in METRIC_COLUMNS:
+            column = getattr(SensorData, name)
+            columns += [func.min(column), func.max(column), func.coalesce(func.sum(column), 0.0), func.count(column)]
+        source = db.select(*columns).where(*criteria).group_by(SensorData.sensor_id, bucket)
+        db.session.execute(_merge_into_rollups(source, replace))
+
+
+def update_rollups(rows):
+    """
+    Merges newly inserted reading rows (dicts with sensor_id, timestamp and metric
+    columns) into the rollup tables. The caller owns the transaction and must commit.
+    """
+    rollups = _aggregate(rows)
+    if rollups:
+        db.session.execute(_merge_into_rollups(), rollups)
+
+
+def adjust_rollups(sensor_id, timestamp, old, new=None):
+    """
+    Applies the change of a single reading to the buckets containing it, without
+    reading the rest of their data. `old` and `new` map metric columns to the values
+    before and after an update; `new` is None when the reading was deleted.
+    Counts and sums take the difference; a min or max is only recomputed from the
+    bucket's raw readings when the value that held it went away. Buckets that no
+    longer exist (expired 1m rollups) are left alone.
+    Call after the raw change has been executed; the caller must commit.
+    """
+    for resolution, width in RESOLUTIONS.items():
+        bucket = bucket_start(timestamp, resolution)
+        rollup = db.session.get(SensorRollup, (sensor_id, resolution, bucket))
+        if rollup is None:
+            continue
+        if new is None:
+            rollup.count -= 1
+            if rollup.count <= 0:
+                db.session.delete(rollup)
+                continue
+        stale = []
+        for column in METRIC_COLUMNS:
+            before = old.get(column)
+            after = new.get(column) if new is not None else None
+            if before == after:
+                continue
+            setattr(rollup, f"{column}_sum", getattr(rollup, f"{column}_sum") + (after or 0.0) - (before or 0.0))
+            setattr(rollup, f"{column}_count",
+                    getattr(rollup, f"{column}_count") + (after is not None) - (before is not None))
+            low, high = getattr(rollup, f"{column}_min"), getattr(rollup, f"{column}_max")
+            if before is not None and before in (low, high):
+                stale.append(column)
+            elif after is not None:
+                setattr(rollup, f"{column}_min", after if low is None else min(low, after))
+                setattr(rollup, f"{column}_max", after if high is None else max(high, after))
+        if stale:
+            end = bucket + timedelta(seconds=width)
+            Data = sensor_data_entity(bucket, end)
+            extremes = db.session.execute(
+                db.select(*[aggregate(getattr(Data, column)) for column in stale for aggregate in (func.min, func.max)])
+                .where(Data.sensor_id == sensor_id, Data.timestamp >= bucket, Data.timestamp < end)
+            ).one()
+            for i, column in enumerate(stale):
+                setattr(rollup, f"{column}_min", extremes[2 * i])
+                setattr(rollup, f"{column}_max", extremes[2 * i + 1])
+
+
+def _retained_start(sensor_id, start):
+    cutoff = raw_cutoffs([sensor_id]).get(sensor_id)
+    return start if cutoff is None or start >= cutoff else cutoff
+
+
+def rebuild_rollups(sensor_id, start, end):
+    """
+    Recomputes every rollup bucket of sensor_id overlapping [start, end] from raw data.
+    Days before the sensor's retention cutoff are skipped: their raw readings are
+    gone, and rebuilding would replace the kept hourly and daily buckets with nothing.
+    The caller owns the transaction and must commit. Returns the number of readings aggregated.
+    """
+    start = _retained_start(sensor_id, bucket_start(start, "1d"))
+    end = bucket_start(end, "1d") + timedelta(days=1)
+    if start >= end:
+        return 0
+    db.session.execute(
+        delete(SensorRollup).where(
+            SensorRollup.sensor_id == sensor_id,
+            SensorRollup.bucket >= start,
+            SensorRollup.bucket < end,
+        )
+    )
+    merge_rollups_from_raw(SensorData.sensor_id == sensor_id, SensorData.timestamp >= start, SensorData.timestamp < end)
+    return db.session.scalar(
+        db.select(func.coalesce(func.sum(SensorRollup.count), 0)).where(
+            SensorRollup.sensor_id == sensor_id,
+            SensorRollup.resolution == "1d",
+            SensorRollup.bucket >= start,
+            SensorRollup.bucket < end,
+        )
+    )
+
+
+def _repair_hour(sensor_id, hour, minute_cutoff):
+    """
+    Makes the 1m and 1h buckets of one hour match its raw readings, then the day's
+    1d bucket match its 1h buckets. Buckets are overwritten in place; only those
+    whose raw readings are all gone are deleted. 1m buckets that retention has
+    already expired are not recreated.
+    """
+    end = hour + timedelta(hours=1)
+    in_hour = (SensorData.sensor_id == sensor_id, SensorData.timestamp >= hour, SensorData.timestamp < end)
+    merge_rollups_from_raw(*in_hour, resolutions=["1h"], replace=True)
+    minute_start = hour
+    if minute_cutoff is not None:
+        # First whole minute whose bucket is still kept
+        minute_start = max(hour, bucket_start(minute_cutoff + timedelta(seconds=60) - timedelta.resolution, "1m"))
+    if minute_start < end:
+        merge_rollups_from_raw(*in_hour, SensorData.timestamp >= minute_start, resolutions=["1m"], replace=True)
+
+    Data = sensor_data_entity(hour, end)
+    minute = epoch_bucket_expression(Data.timestamp, 60)
+    minutes = set(db.session.scalars(
+        db.select(minute).where(Data.sensor_id == sensor_id, Data.timestamp >= hour, Data.timestamp < end).distinct()
+    ))
+    emptied = [
+        bucket
+        for resolution, bucket in db.session.execute(
+            db.select(SensorRollup.resolution, SensorRollup.bucket).where(
+                SensorRollup.sensor_id == sensor_id,
+                SensorRollup.resolution.in_(["1m", "1h"]),
+                SensorRollup.bucket >= hour,
+                SensorRollup.bucket < end,
+            )
+        )
+        if (int(epoch_seconds(bucket)) not in minutes if resolution == "1m" else not minutes)
+    ]
+    if emptied:
+        db.session.execute(delete(SensorRollup).where(
+            SensorRollup.sensor_id == sensor_id,
+            SensorRollup.resolution.in_(["1m", "1h"]),
+            SensorRollup.bucket.in_(emptied),
+        ))
+
+    day = bucket_start(hour, "1d")
+    in_day = (
+        SensorRollup.sensor_id == sensor_id,
+        SensorRollup.resolution == "1h",
+        SensorRollup.bucket >= day,
+        SensorRollup.bucket < day + timedelta(days=1),
+    )
+    if db.session.scalar(db.select(func.count()).where(*in_day)):
+        day_bucket = bucket_expression("1d", SensorRollup.bucket)
+        columns = [SensorRollup.sensor_id, literal("1d"), day_bucket, func.sum(SensorRollup.count)]
+        for name in METRIC_COLUMNS:
+            columns += [
+                func.min(getattr(SensorRollup, f"{name}_min")),
+                func.max(getattr(SensorRollup, f"{name}_max")),
+                func.sum(getattr(SensorRollup, f"{name}_sum")),
+                func.sum(getattr(SensorRollup, f"{name}_count")),
+            ]
+        source = db.select(*columns).where(*in_day).group_by(SensorRollup.sensor_id, day_bucket)
+        db.session.execute(_merge_into_rollups(source, replace=True))
+    else:
+        db.session.execute(delete(SensorRollup).where(
+            SensorRollup.sensor_id == sensor_id, SensorRollup.resolution == "1d", SensorRollup.bucket == day
+        ))
+
+
+def reconcile_rollups(start, now=None):
+    """
+    Repairs the rollups of readings written or deleted around the write paths since
+    `start`. Raw reading counts per sensor and hour are compared with the 1h buckets,
+    and only the hours that differ are recomputed (see _repair_hour); matching
+    buckets are not rewritten. Hours before a sensor's retention cutoff are never
+    touched, since their raw readings may be gone. Commits once per sensor and
+    invalidates its cached responses. Returns the number of hours repaired.
+    """
+    now = now or utc_now()
+    start = bucket_start(start, "1h")
+    Data = sensor_data_entity(start)
+    hour = epoch_bucket_expression(Data.timestamp, 3600)
+    raw = {
+        (sensor_id, seconds): count
+        for sensor_id, seconds, count in db.session.execute(
+            db.select(Data.sensor_id, hour, func.count()).where(Data.timestamp >= start).group_by(Data.sensor_id, hour)
+        )
+    }
+    rolled = {
+        (sensor_id, int(epoch_seconds(bucket))): count
+        for sensor_id, bucket, count in db.session.execute(
+            db.select(SensorRollup.sensor_id, SensorRollup.bucket, SensorRollup.count)
+            .where(SensorRollup.resolution == "1h", SensorRollup.bucket >= start)
+        )
+    }
+    stale = {}
+    for key in raw.keys() | rolled.keys():
+        if raw.get(key, 0) != rolled.get(key, 0):
+            stale.setdefault(key[0], []).append(EPOCH + timedelta(seconds=key[1]))
+
+    cutoffs = raw_cutoffs(list(stale), now)
+    minute_cutoff = minute_rollup_cutoff(now)
+    repaired = 0
+    for sensor_id, hours in sorted(stale.items()):
+        cutoff = cutoffs.get(sensor_id)
+        for hour_start in sorted(hours):
+            if cutoff is None or hour_start >= cutoff:
+                _repair_hour(sensor_id, hour_start, minute_cutoff)
+                repaired += 1
+        db.session.commit()
+        response_cache.invalidate("sensor_data", f"sensor:{sensor_id}")
+    return repaired
+
+
+def backfill_rollups(sensor_ids=None, start=None, end=None):
+    """
+    Rebuilds rollups from the raw sensor_data table, optionally restricted to some
+    sensors and a time range. Commits once per sensor. Returns the number of
+    readings processed.
+    """
+    query = db.select(SensorData.sensor_id, func.min(SensorData.timestamp), func.max(SensorData.timestamp))
+    if sensor_ids:
+        query = query.where(SensorData.sensor_id.in_(sensor_ids))
+    if start is not None:
+        query = query.where(SensorData.timestamp >= start)
+    if end is not None:
+        query = query.where(SensorData.timestamp < end)
+    ranges = db.session.execute(query.group_by(SensorData.sensor_id)).all()
+
+    total = 0
+    for sensor_id, first, last in ranges:
+        total += rebuild_rollups(sensor_id, first, last)
+        db.session.commit()
+        print(f"Rebuilt rollups for sensor {sensor_id} ({first} - {last}).")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild sensor rollup tables from raw sensor data.")
+    parser.add_argument("--sensor", type=int, action="append", dest="sensor_ids", help="Sensor ID (repeatable).")
+    parser.add_argument("--from", dest="start", type=parse_timestamp, help="Only rebuild buckets from this time.")
+    parser.add_argument("--to", dest="end", type=parse_timestamp, help="Only rebuild buckets up to this time.")
+    args = parser.parse_args()
+    with app.app_context():
+        db.create_all()
+        processed = backfill_rollups(args.sensor_ids, args.start, args.end)
+        print(f"Backfill complete: {processed} readings aggregated.")
@@ -0,0 +1,283 @@
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import app, request_metrics, response_cache
+from utils.generate_data import generate_readings
+from utils.retention import apply_retention
+from utils.rollups import reconcile_rollups
+from utils.timeseries import utc_now
+
+try:
+    import fcntl
+except ImportError:  # Windows: jobs are only protected against overlap within one process
+    fcntl = None
+
+
+class Job:
+    __slots__ = ("name", "func", "interval", "jitter", "lock", "running", "runs", "failed", "skipped",
+                 "duration_total", "last_duration", "last_success")
+
+    def __init__(self, name, func, interval, jitter):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.running = False
+        self.runs = 0
+        self.failed = 0
+        self.skipped = 0
+        self.duration_total = 0.0
+        self.last_duration = None
+        self.last_success = None
+
+
+class Scheduler:
+    """
+    Runs periodic maintenance jobs in one long-lived process, so each run costs
+    only the work itself: the app, its configuration and the pooled database
+    connections stay loaded between runs, and every run gets a fresh app context.
+
+    Every enabled job has its own thread and a fixed-rate schedule. Each run
+    starts up to SCHEDULER_JITTER x interval later than its slot, so processes
+    started together do not hit the database at the same moment. Runs that
+    would overlap are skipped and counted, never queued: a run still going when
+    its next slot comes moves that slot forward, and a job already running in
+    another process (tracked with a lock file in SCHEDULER_LOCK_DIR) is skipped.
+
+    Run it as a service with `python -m utils.scheduler`. The development server
+    also starts it in-process; gunicorn workers do not, since every worker would
+    run every job. As a separate service its cache invalidations must reach the
+    web server, so it refuses to start with CACHE_BACKEND=memory.
+
+    Configuration:
+      GENERATE_DATA_INTERVAL_SECONDS      random reading per sensor (0 disables; may be below a minute)
+      ROLLUP_RECONCILE_INTERVAL_MINUTES   repair the rollups of hours whose reading counts no longer match
+      RETENTION_INTERVAL_MINUTES          expire old readings (see utils.retention)
+      SCHEDULER_JITTER                    fraction of the interval a run may start late (default 0.1)
+      SCHEDULER_LOCK_DIR                  lock files for cross-process overlap protection (default: instance folder)
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.jobs = {}
+        self.jitter = 0.1
+        self.lock_dir = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._collecting = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.jitter = app.config.get("SCHEDULER_JITTER", 0.1)
+        self.lock_dir = app.config.get("SCHEDULER_LOCK_DIR") or app.instance_path
+        rollup_interval = app.config.get("ROLLUP_RECONCILE_INTERVAL_MINUTES", 0) * 60
+        # Each pass covers two intervals so consecutive passes overlap; a manual run covers a day
+        rollup_window = timedelta(seconds=rollup_interval * 2 or 86400)
+        self.add_job("generate_data", generate_readings, app.config.get("GENERATE_DATA_INTERVAL_SECONDS", 0))
+        # Write paths keep rollups current; this repairs rows written around them (e.g. by hand in SQL)
+        self.add_job("rollups", lambda: reconcile_rollups(utc_now() - rollup_window), rollup_interval)
+        self.add_job("retention", apply_retention, app.config.get("RETENTION_INTERVAL_MINUTES", 0) * 60)
+
+    def add_job(self, name, func, interval):
+        """
+        Registers `func` to run every `interval` seconds inside an app context.
+        A job with interval 0 is not scheduled but can still be run with run_job().
+        """
+        self.jobs[name] = Job(name, func, interval, interval * self.jitter)
+
+    def enabled_jobs(self):
+        return [job for job in self.jobs.values() if job.interval > 0]
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        if not self._collecting:
+            request_metrics.add_collector(self.metrics)
+            self._collecting = True
+        for job in self.enabled_jobs():
+            thread = threading.Thread(target=self._run, args=(job,), name=f"scheduler-{job.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Stops scheduling and waits up to `timeout` seconds for running jobs to finish.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, job):
+        due = time.monotonic() + job.interval
+        while not self._stop.wait(max(due + random.uniform(0, job.jitter) - time.monotonic(), 0)):
+            self.run_job(job.name)
+            due += job.interval
+            now = time.monotonic()
+            if due <= now:
+                missed = int((now - due) // job.interval) + 1
+                with job.lock:
+                    job.skipped += missed
+                due += missed * job.interval
+
+    def _acquire_lock_file(self, job):
+        if fcntl is None:
+            return None
+        os.makedirs(self.lock_dir, exist_ok=True)
+        handle = open(os.path.join(self.lock_dir, f"scheduler-{job.name}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            raise
+        return handle
+
+    def run_job(self, name):
+        """
+        Runs a job now unless it is already running in this or another process.
+        Returns True if it ran and succeeded.
+        """
+        job = self.jobs[name]
+        with job.lock:
+            if job.running:
+                job.skipped += 1
+                return False
+            job.running = True
+        try:
+            try:
+                lock_file = self._acquire_lock_file(job)
+            except BlockingIOError:
+                self.app.logger.info("Job %s is running in another process, skipped", job.name)
+                with job.lock:
+                    job.skipped += 1
+                return False
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    result = job.func()
+                succeeded = True
+            except Exception:
+                self.app.logger.exception("Job %s failed", job.name)
+                result = None
+                succeeded = False
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+            elapsed = time.perf_counter() - started
+            with job.lock:
+                job.runs += 1
+                job.duration_total += elapsed
+                job.last_duration = elapsed
+                if succeeded:
+                    job.last_success = time.time()
+                else:
+                    job.failed += 1
+            if succeeded:
+                self.app.logger.info("Job %s finished in %.1f ms: %s", job.name, elapsed * 1000, result)
+            return succeeded
+        finally:
+            with job.lock:
+                job.running = False
+
+    def stats(self):
+        stats = {}
+        for job in self.jobs.values():
+            with job.lock:
+                stats[job.name] = {
+                    "intervalSeconds": job.interval,
+                    "running": job.running,
+                    "runs": job.runs,
+                    "failed": job.failed,
+                    "skipped": job.skipped,
+                    "durationSeconds": job.duration_total,
+                    "lastDurationSeconds": job.last_duration,
+                    "lastSuccess": job.last_success,
+                }
+        return stats
+
+    def metrics(self):
+        """
+        Collector for RequestMetrics.render(), registered by start().
+        """
+        stats = {name: job for name, job in self.stats().items() if job["intervalSeconds"] > 0 or job["runs"]}
+        runs = []
+        for outcome in ("succeeded", "failed", "skipped"):
+            for name, job in stats.items():
+                count = job["runs"] - job["failed"] if outcome == "succeeded" else job[outcome]
+                runs.append(({"job": name, "outcome": outcome}, count))
+        return [
+            ("scheduler_job_runs_total", "counter", "Job runs by outcome; skipped runs would have overlapped another.", runs),
+            ("scheduler_job_duration_seconds_total", "counter", "Time spent running each job.",
+             [({"job": name}, f"{job['durationSeconds']:.6f}") for name, job in stats.items()]),
+            ("scheduler_job_last_duration_seconds", "gauge", "Duration of each job's latest run.",
+             [({"job": name}, f"{job['lastDurationSeconds']:.6f}") for name, job in stats.items()
+              if job["lastDurationSeconds"] is not None]),
+            ("scheduler_job_last_success_timestamp_seconds", "gauge", "Unix time each job last succeeded.",
+             [({"job": name}, f"{job['lastSuccess']:.3f}") for name, job in stats.items() if job["lastSuccess"] is not None]),
+            ("scheduler_job_running", "gauge", "1 while the job runs in this process.",
+             [({"job": name}, int(job["running"])) for name, job in stats.items()]),
+        ]
+
+
+scheduler = Scheduler(app)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = request_metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the periodic maintenance jobs (data generation, rollups, retention).")
+    parser.add_argument("--once", choices=sorted(scheduler.jobs), help="Run one job now and exit, whatever its interval.")
+    parser.add_argument("--metrics-port", type=int, help="Serve job metrics at http://127.0.0.1:PORT/metrics.")
+    args = parser.parse_args()
+    app.logger.setLevel(logging.INFO)
+
+    stale_cache = response_cache.process_local_warning()
+    if args.once:
+        if stale_cache:
+            app.logger.warning(stale_cache)
+        succeeded = scheduler.run_job(args.once)
+        print(json.dumps(scheduler.stats()[args.once], indent=2))
+        raise SystemExit(0 if succeeded else 1)
+
+    if not scheduler.enabled_jobs():
+        raise SystemExit("No job is enabled. Set GENERATE_DATA_INTERVAL_SECONDS, "
+                         "ROLLUP_RECONCILE_INTERVAL_MINUTES or RETENTION_INTERVAL_MINUTES.")
+    if stale_cache:
+        raise SystemExit(f"{stale_cache} Or run the jobs inside the development server (python main.py).")
+    if args.metrics_port:
+        server = ThreadingHTTPServer(("127.0.0.1", args.metrics_port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="scheduler-metrics", daemon=True).start()
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    scheduler.start()
+    for job in scheduler.enabled_jobs():
+        app.logger.info("Scheduled %s every %s s", job.name, job.interval)
+    stopping.wait()
+    app.logger.info("Stopping, waiting for running jobs to finish")
+    scheduler.stop()
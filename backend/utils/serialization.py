@@ -0,0 +1,72 @@
+from models import Sensor, SensorData
+
+# Column order shared by the tuple-returning queries and the serializers below.
+# Selecting these columns directly skips ORM object construction and identity-map bookkeeping.
+SENSOR_COLUMNS = (Sensor.id, Sensor.name, Sensor.ip_address, Sensor.retention_days)
+DATA_POINT_COLUMNS = (
+    SensorData.id,
+    SensorData.temperature,
+    SensorData.humidity,
+    SensorData.pressure,
+    SensorData.light_level,
+    SensorData.timestamp,
+    SensorData.sensor_id,
+)
+
+
+def sensor_json(row):
+    """
+    API representation of a (id, name, ip_address, retention_days) row, matching Sensor.to_json().
+    """
+    return {"id": row[0], "name": row[1], "ipAddress": row[2], "retentionDays": row[3]}
+
+
+def data_point_json(row):
+    """
+    API representation of a sensor_data row given as a mapping of column names,
+    matching SensorData.to_json() without building an ORM object. The timestamp is
+    left as a datetime for the JSON provider to encode.
+    """
+    return {
+        "id": row["id"],
+        "temperature": row["temperature"],
+        "humidity": row["humidity"],
+        "pressure": row["pressure"],
+        "lightLevel": row["light_level"],
+        "timestamp": row["timestamp"],
+        "sensorId": row["sensor_id"],
+    }
+
+
+def data_points_json(rows):
+    """
+    Serializes rows selected with DATA_POINT_COLUMNS into a list of data point objects.
+    """
+    return [
+        {
+            "id": row[0],
+            "temperature": row[1],
+            "humidity": row[2],
+            "pressure": row[3],
+            "lightLevel": row[4],
+            "timestamp": row[5],
+            "sensorId": row[6],
+        }
+        for row in rows
+    ]
+
+
+def data_points_columnar(rows):
+    """
+    Serializes rows selected with DATA_POINT_COLUMNS into one array per field.
+    Keys are written once instead of once per point, which suits charting clients.
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(DATA_POINT_COLUMNS)
+    return {
+        "ids": list(columns[0]),
+        "timestamps": list(columns[5]),
+        "temperature": list(columns[1]),
+        "humidity": list(columns[2]),
+        "pressure": list(columns[3]),
+        "lightLevel": list(columns[4]),
+    }
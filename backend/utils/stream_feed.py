@@ -0,0 +1,93 @@
+import threading
+from sqlalchemy import func
+from config import app, broadcaster, db
+from utils.partitions import physical_tables
+
+
+class StreamFeed:
+    """
+    Feeds the broadcaster from the database instead of from this process's own
+    writes, so SSE clients also see readings committed by other gunicorn workers,
+    the scheduler or scripts. While anyone is subscribed, a thread polls every
+    table holding readings for ids above the highest one it has seen and publishes
+    the new rows. A write in this process wakes it right away (see wake()); other
+    writers are picked up within STREAM_POLL_MS.
+
+    SQLite hands out ids under its single write lock, so within a table they become
+    visible in increasing order and no committed row is skipped.
+
+    When more than the broadcaster's queue size of rows arrive between two polls
+    (a bulk import, say), they are not replayed: subscribers get a resync instead.
+
+    Configuration:
+      STREAM_POLL_MS   longest delay before another process's readings are streamed
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.poll_interval = 1.0
+        self._marks = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_interval = app.config.get("STREAM_POLL_MS", 1000) / 1000
+
+    def wake(self):
+        """
+        Polls now rather than at the next interval. Called after local commits.
+        """
+        if self._thread is not None:
+            self._wake.set()
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stream-feed", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if not broadcaster.subscriber_count:
+                # Start from the newest rows again once someone subscribes
+                self._marks = None
+                continue
+            try:
+                with self.app.app_context():
+                    self.poll()
+            except Exception:
+                self.app.logger.exception("Polling for new readings failed")
+
+    def poll(self):
+        """
+        Publishes rows committed since the previous poll. The first poll only
+        records where each table ends. Needs an app context.
+        """
+        limit = broadcaster.max_queue
+        first = self._marks is None
+        marks = {}
+        for table in physical_tables():
+            mark = None if first else self._marks.get(table.name, 0)
+            if mark is not None:
+                rows = db.session.execute(
+                    db.select(table).where(table.c.id > mark).order_by(table.c.id).limit(limit + 1)
+                ).mappings().all()
+                if len(rows) <= limit:
+                    broadcaster.publish([dict(row) for row in rows])
+                    marks[table.name] = rows[-1]["id"] if rows else mark
+                    continue
+                broadcaster.resync()
+            marks[table.name] = db.session.scalar(db.select(func.coalesce(func.max(table.c.id), 0)))
+        db.session.rollback()
+        self._marks = marks
+
+
+stream_feed = StreamFeed(app)
@@ -0,0 +1,210 @@
+import argparse
+import time
+from datetime import timedelta
+import numpy as np
+from config import app, db
+from models import Sensor, User
+from utils.ingest import insert_readings, insert_sqlite_values
+from utils.timeseries import parse_timestamp, utc_now
+
+SYNTHETIC_CHUNK_SIZE = 50000
+DAY_SECONDS = 86400
+
+
+class SensorProfile:
+    """
+    Per-sensor parameters of the synthetic signal, drawn once so every chunk of
+    a run continues the same curves.
+    """
+
+    def __init__(self, rng, count, span_seconds, drift_fraction, outages_per_day, outage_minutes):
+        self.base_temperature = rng.uniform(18.0, 24.0, count)
+        self.temperature_amplitude = rng.uniform(1.5, 6.0, count)
+        # Fraction of a day by which the daily cycle is shifted, e.g. sensors facing east or west
+        self.phase = rng.normal(0.0, 0.04, count)
+        self.base_humidity = rng.uniform(35.0, 55.0, count)
+        self.weather_period = rng.uniform(2.0, 6.0, count) * DAY_SECONDS
+        self.weather_phase = rng.uniform(0.0, 2 * np.pi, count)
+        self.base_pressure = rng.uniform(1005.0, 1020.0, count)
+        self.peak_light = rng.uniform(400.0, 1000.0, count)
+        drifting = rng.random(count) < drift_fraction
+        self.drift_per_day = np.where(drifting, rng.uniform(-0.3, 0.3, count), 0.0)
+
+        # Outages as (sensor index, start offset, end offset) in seconds from the run start
+        outages = rng.poisson(outages_per_day * span_seconds / DAY_SECONDS, count)
+        self.outage_sensor = np.repeat(np.arange(count), outages)
+        self.outage_start = rng.uniform(0, span_seconds, outages.sum())
+        self.outage_end = self.outage_start + rng.exponential(outage_minutes * 60, outages.sum())
+
+    def offline(self, offsets):
+        """
+        Boolean (steps, sensors) mask of readings that fall inside an outage.
+        """
+        mask = np.zeros((len(offsets), len(self.base_temperature)), dtype=bool)
+        inside = (offsets[:, None] >= self.outage_start) & (offsets[:, None] < self.outage_end)
+        steps, outage = np.nonzero(inside)
+        mask[steps, self.outage_sensor[outage]] = True
+        return mask
+
+
+def generate_chunks(sensor_ids, start, end, interval_seconds=60, seed=42, chunk_size=SYNTHETIC_CHUNK_SIZE,
+                    drop_rate=0.002, missing_rate=0.001, drift_fraction=0.1, outages_per_day=0.05, outage_minutes=120):
+    """
+    Yields dicts of NumPy columns (sensor_id, timestamp as datetime64[us], temperature,
+    humidity, pressure, light_level) with about chunk_size readings each, covering
+    [start, end) at one reading per sensor every interval_seconds, interleaved by time
+    like a live fleet.
+
+    The signal has a daily temperature and light cycle, humidity moving against
+    temperature, slow pressure fronts and gaussian noise. drift_fraction of the
+    sensors slowly drift away from their calibration, readings are lost at
+    drop_rate and during occasional outages, and optional metrics are missing at
+    missing_rate (NaN). Output is deterministic for a given seed and arguments.
+    """
+    rng = np.random.default_rng(seed)
+    sensor_ids = np.asarray(sensor_ids, dtype=np.int64)
+    count = len(sensor_ids)
+    span = (end - start).total_seconds()
+    steps_total = int(span // interval_seconds)
+    if count == 0 or steps_total <= 0:
+        return
+    profile = SensorProfile(rng, count, span, drift_fraction, outages_per_day, outage_minutes)
+    origin = np.datetime64(start.replace(tzinfo=None), "us")
+    # Seconds into the UTC day at the first step, so the cycle peaks mid-afternoon
+    start_of_day = (start.hour * 3600 + start.minute * 60 + start.second) / DAY_SECONDS
+
+    steps_per_chunk = max(1, chunk_size // count)
+    for first_step in range(0, steps_total, steps_per_chunk):
+        offsets = np.arange(first_step, min(first_step + steps_per_chunk, steps_total), dtype=np.float64) * interval_seconds
+        shape = (len(offsets), count)
+        day = (start_of_day + offsets[:, None] / DAY_SECONDS - profile.phase) % 1.0
+        daily = np.sin(2 * np.pi * (day - 0.375))  # peaks at 15:00
+        drift = profile.drift_per_day * offsets[:, None] / DAY_SECONDS
+
+        temperature = (profile.base_temperature + profile.temperature_amplitude * daily + drift
+                       + rng.normal(0.0, 0.25, shape))
+        humidity = np.clip(profile.base_humidity - 2.5 * (temperature - profile.base_temperature)
+                           + rng.normal(0.0, 1.0, shape), 5.0, 100.0)
+        pressure = (profile.base_pressure
+                    + 8.0 * np.sin(2 * np.pi * offsets[:, None] / profile.weather_period + profile.weather_phase)
+                    + rng.normal(0.0, 0.4, shape))
+        light_level = np.clip(profile.peak_light * np.sin(2 * np.pi * (day - 0.25)), 0.0, None) * rng.uniform(0.7, 1.0, shape)
+        light_level += 20.0 + rng.normal(0.0, 5.0, shape)
+        light_level = np.clip(light_level, 0.0, None)
+
+        pressure[rng.random(shape) < missing_rate] = np.nan
+        light_level[rng.random(shape) < missing_rate] = np.nan
+        keep = (rng.random(shape) >= drop_rate) & ~profile.offline(offsets)
+
+        timestamps = origin + (offsets * 1_000_000).astype("timedelta64[us]")
+        yield {
+            "sensor_id": np.broadcast_to(sensor_ids, shape)[keep],
+            "timestamp": np.broadcast_to(timestamps[:, None], shape)[keep],
+            "temperature": np.round(temperature[keep], 2),
+            "humidity": np.round(humidity[keep], 2),
+            "pressure": np.round(pressure[keep], 2),
+            "light_level": np.round(light_level[keep], 2),
+        }
+
+
+def _nullable(column):
+    values = column.astype(object)
+    values[np.isnan(column)] = None
+    return values
+
+
+def write_chunk(chunk):
+    """
+    Inserts one chunk from generate_chunks with the bulk load path and merges it
+    into the rollups. The caller owns the transaction and must commit.
+    Returns the number of readings written.
+    """
+    columns = [
+        chunk["sensor_id"].tolist(),
+        None,
+        chunk["temperature"].tolist(),
+        chunk["humidity"].tolist(),
+        _nullable(chunk["pressure"]).tolist(),
+        _nullable(chunk["light_level"]).tolist(),
+    ]
+    if db.session.get_bind().dialect.name == "sqlite":
+        # One vectorized pass producing SQLITE_TIMESTAMP_FORMAT instead of a strftime per row
+        text = np.datetime_as_string(chunk["timestamp"], unit="us")
+        columns[1] = np.char.replace(text, "T", " ").tolist()
+        insert_sqlite_values(list(zip(*columns)))
+    else:
+        columns[1] = chunk["timestamp"].tolist()
+        names = ("sensor_id", "timestamp", "temperature", "humidity", "pressure", "light_level")
+        insert_readings([dict(zip(names, values)) for values in zip(*columns)], returning=False)
+    return len(columns[0])
+
+
+def ensure_sensors(count, seed=42):
+    """
+    Returns the ids of the first `count` sensors, creating synthetic ones owned by
+    existing users when there are not enough. Requires at least one user.
+    """
+    sensor_ids = list(db.session.scalars(db.select(Sensor.id).order_by(Sensor.id).limit(count)))
+    missing = count - len(sensor_ids)
+    if missing > 0:
+        user_ids = list(db.session.scalars(db.select(User.id)))
+        if not user_ids:
+            raise RuntimeError("Create at least one user before generating sensors.")
+        rng = np.random.default_rng(seed)
+        owners = rng.choice(user_ids, missing).tolist()
+        first = len(sensor_ids)
+        sensors = [
+            Sensor(
+                name=f"Synthetic Sensor {i + 1}",
+                ip_address=f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                user_id=owner,
+            )
+            for i, owner in zip(range(first, count), owners)
+        ]
+        db.session.add_all(sensors)
+        db.session.commit()
+        sensor_ids += [sensor.id for sensor in sensors]
+    return sensor_ids
+
+
+def generate_history(sensor_ids, start, end, interval_seconds=60, seed=42, chunk_size=SYNTHETIC_CHUNK_SIZE, **options):
+    """
+    Generates and stores synthetic history for the given sensors, committing once
+    per chunk and printing progress in rows per second. Extra keyword arguments are
+    passed to generate_chunks. Returns the number of readings written.
+    """
+    written = 0
+    started = time.perf_counter()
+    for chunk in generate_chunks(sensor_ids, start, end, interval_seconds, seed, chunk_size, **options):
+        written += write_chunk(chunk)
+        db.session.commit()
+        print(f"{written} readings written ({written / (time.perf_counter() - started):,.0f} rows/s)")
+    elapsed = time.perf_counter() - started
+    if written:
+        print(f"Generated {written} readings in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s).")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate realistic synthetic sensor history with NumPy.")
+    parser.add_argument("--sensors", type=int, default=10, help="Number of sensors, created when missing.")
+    parser.add_argument("--days", type=float, default=7, help="Length of the history, ending now.")
+    parser.add_argument("--from", dest="start", type=parse_timestamp, help="Start of the history (overrides --days).")
+    parser.add_argument("--to", dest="end", type=parse_timestamp, help="End of the history. Defaults to now.")
+    parser.add_argument("--interval", type=int, default=60, help="Seconds between readings of one sensor.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=SYNTHETIC_CHUNK_SIZE)
+    parser.add_argument("--drop-rate", type=float, default=0.002, help="Probability of losing a single reading.")
+    parser.add_argument("--drift-fraction", type=float, default=0.1, help="Fraction of sensors that drift.")
+    parser.add_argument("--outages-per-day", type=float, default=0.05, help="Average outages per sensor per day.")
+    args = parser.parse_args()
+
+    end = args.end or utc_now()
+    start = args.start or end - timedelta(days=args.days)
+    with app.app_context():
+        db.create_all()
+        sensor_ids = ensure_sensors(args.sensors, args.seed)
+        generate_history(
+            sensor_ids, start, end, args.interval, args.seed, args.chunk_size,
+            drop_rate=args.drop_rate, drift_fraction=args.drift_fraction, outages_per_day=args.outages_per_day,
+        )
@@ -0,0 +1,60 @@
+import base64
+import binascii
+from datetime import datetime, timezone
+
+
+def utc_now():
+    """
+    Current time as a naive UTC datetime, the form timestamps are stored in.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_timestamp(value):
+    """
+    Parses an ISO-8601 string (or datetime) into a naive UTC datetime.
+    Offset-aware values are converted to UTC; naive values are assumed to be UTC.
+    Raises ValueError for anything that is not a valid timestamp.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        parsed = datetime.fromisoformat(text)
+    else:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def epoch_seconds(value):
+    """
+    Seconds since the Unix epoch for a naive UTC datetime.
+    """
+    return (value - EPOCH).total_seconds()
+
+
+def encode_cursor(timestamp, row_id):
+    """
+    Builds an opaque keyset-pagination cursor from a (timestamp, id) pair.
+    """
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Reverses encode_cursor. Raises ValueError for a malformed cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return parse_timestamp(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
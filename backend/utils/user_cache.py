@@ -0,0 +1,89 @@
+from config import app, db
+from models import User
+from utils.cache import MemoryCacheBackend
+
+
+class CachedUser:
+    """
+    Read-only snapshot of the fields protected routes need from a user. Unlike an
+    ORM instance it is not bound to a session, so one copy can be shared by every
+    request in the process. The password hash is deliberately left out.
+    """
+
+    __slots__ = ("id", "username", "first_name", "last_name", "email", "is_admin")
+
+    def __init__(self, id, username, first_name, last_name, email, is_admin):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.is_admin = bool(is_admin)
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "firstName": self.first_name,
+            "lastName": self.last_name,
+            "email": self.email,
+        }
+
+
+def load_user(user_id):
+    row = db.session.execute(
+        db.select(User.id, User.username, User.first_name, User.last_name, User.email, User.is_admin)
+        .where(User.id == user_id)
+    ).first()
+    return CachedUser(*row) if row is not None else None
+
+
+class UserCache:
+    """
+    Process-level cache of CachedUser snapshots by id, consulted by the JWT
+    user_lookup_loader so authenticated requests do not pay a SELECT each.
+    flask-jwt-extended keeps the loaded user for the rest of the request, which
+    makes repeated current_user access within a request free as well.
+
+    Entries live USER_CACHE_TTL seconds (0 disables the cache). Changes made by
+    this process call invalidate(); other workers see them once the entry expires.
+
+    Configuration:
+      USER_CACHE_TTL           seconds a snapshot is reused
+      USER_CACHE_MAX_ENTRIES   users kept per process, least recently used evicted first
+    """
+
+    def __init__(self, load, app=None):
+        self.load = load
+        self.ttl = 0
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get("USER_CACHE_TTL", 60)
+        self.backend = MemoryCacheBackend(app.config.get("USER_CACHE_MAX_ENTRIES", 1024))
+
+    def get(self, user_id):
+        """
+        Snapshot of the user, or None when it does not exist. Misses are not cached,
+        so a newly registered user is found immediately.
+        """
+        user_id = int(user_id)
+        if self.ttl <= 0:
+            return self.load(user_id)
+        user = self.backend.get(user_id)
+        if user is None:
+            user = self.load(user_id)
+            if user is not None:
+                self.backend.set(user_id, user, self.ttl)
+        return user
+
+    def invalidate(self, user_id):
+        """
+        Drops the cached snapshot. Call after committing a change to the user.
+        """
+        if self.backend is not None:
+            self.backend.delete(int(user_id))
+
+
+user_cache = UserCache(load_user, app)
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module never touches the database. Run `python -m utils.migrations`
+(the gunicorn config does it once in the master process) before serving.
+"""
+from app_factory import create_app
+
+app = create_app()
@@ -5,6 +5,8 @@ import DataPointForm from './DataPointForm';
 import './SensorDetailsPage.css'; // Import component-specific styles
 import { useAuth } from './context/AuthContext';
 
+const MAX_CHART_POINTS = 1000;
+
 const SensorDetailsPage = () => {
     const [sensorDetails, setSensorDetails] = useState(null);
     const [loading, setLoading] = useState(true);
@@ -19,7 +21,8 @@ const SensorDetailsPage = () => {
         try {
             setLoading(true);
             setError(null);
-            const response = await fetch(`http://127.0.0.1:5000/details_sensor/${sensorId}`);
+            // Let the server reduce long histories to a chart-sized set of real points
+            const response = await fetch(`http://127.0.0.1:5000/details_sensor/${sensorId}?downsample=${MAX_CHART_POINTS}`);
             if (!response.ok) {
                 throw new Error('Sensor not found');
             }
@@ -36,6 +39,21 @@ const SensorDetailsPage = () => {
         fetchDetails();
     }, [fetchDetails]);
 
+    // Append new readings pushed by the server instead of re-fetching the whole history
+    useEffect(() => {
+        const source = new EventSource(`http://127.0.0.1:5000/stream/sensor_data/${sensorId}`);
+        source.addEventListener('reading', (event) => {
+            const dataPoint = JSON.parse(event.data);
+            setSensorDetails(prev => {
+                if (!prev || (prev.dataPoints || []).some(d => d.id === dataPoint.id)) return prev;
+                // Keep the chart as bounded as the downsampled initial load: drop the oldest points
+                return { ...prev, dataPoints: [...(prev.dataPoints || []), dataPoint].slice(-MAX_CHART_POINTS) };
+            });
+        });
+        source.addEventListener('resync', () => fetchDetails());
+        return () => source.close();
+    }, [sensorId, fetchDetails]);
+
     const closeModal = () => {
         setIsModalOpen(false);
         setCurrentDataPoint({});